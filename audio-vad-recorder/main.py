@@ -3,13 +3,13 @@ import sys
 import signal
 import subprocess
 import threading
-import wave
+import struct
 import logging
 import time
-from collections import deque
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from queue import Queue
+from queue import Empty, Queue
+from typing import Optional
 
 import numpy as np
 import onnxruntime as ort
@@ -19,6 +19,8 @@ import onnxruntime as ort
 # ---------------------------------------------------------------------------
 RTSP_URL = os.environ.get("RTSP_URL", "")
 VAD_THRESHOLD = float(os.environ.get("VAD_THRESHOLD", "0.7"))
+VAD_INT8 = os.environ.get("VAD_INT8", "true").lower() == "true"
+ENERGY_GATE = int(os.environ.get("ENERGY_GATE", "200"))
 CAMERA_NAME = os.environ.get("CAMERA_NAME", "kamera")
 
 PRE_PADDING_S = float(os.environ.get("PRE_PADDING", "0.5"))
@@ -41,11 +43,19 @@ BYTES_PER_SAMPLE = 2         # s16le
 CHUNK_BYTES = CHUNK_SAMPLES * BYTES_PER_SAMPLE
 CHUNK_DURATION_S = CHUNK_SAMPLES / SAMPLE_RATE
 
+READ_CHUNKS = 8              # chunks pulled from the FFmpeg pipe per read call
+READ_BYTES = READ_CHUNKS * CHUNK_BYTES
+READ_QUEUE_BLOCKS = 8        # read-ahead between the FFmpeg reader and VAD loop
+PIPE_BUFSIZE = 1 << 20
+
 POST_PADDING_CHUNKS = int(POST_PADDING_S / CHUNK_DURATION_S)
 PRE_PADDING_CHUNKS = max(1, int(PRE_PADDING_S / CHUNK_DURATION_S))
 
 MIN_SPEECH_SAMPLES = int(MIN_SPEECH_S * SAMPLE_RATE)
 MAX_RECORDING_BYTES = int(MAX_RECORDING_S * SAMPLE_RATE * BYTES_PER_SAMPLE)
+# Pre-padding plus one chunk of overshoot: the max-duration check runs after
+# every chunk appended to a recording, speech or trailing silence alike.
+SPEECH_SLAB_BYTES = MAX_RECORDING_BYTES + (PRE_PADDING_CHUNKS + 1) * CHUNK_BYTES
 
 IDLE_RESET_CHUNKS = int(30.0 / CHUNK_DURATION_S)
 
@@ -86,42 +96,62 @@ transcription_queue: Queue[Path] = Queue()
 _SENTINEL = None
 
 
-def _transcribe_worker():
-    """Daemon thread: picks WAV files from queue and sends them to Whisper API."""
-    import requests
+WHISPER_WORKERS = 4          # concurrent uploads during bursts of recordings
 
-    session = requests.Session()
-    if WHISPER_API_KEY:
-        session.headers["Authorization"] = f"Bearer {WHISPER_API_KEY}"
+_whisper_local = threading.local()
 
-    while True:
-        item = transcription_queue.get()
-        if item is _SENTINEL:
-            break
 
-        wav_path: Path = item
-        txt_path = wav_path.with_suffix(".txt")
+def _whisper_session():
+    """Per-thread ``requests.Session`` with a keep-alive pool to the Whisper API."""
+    session = getattr(_whisper_local, "session", None)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
 
-        try:
-            with open(wav_path, "rb") as f:
-                files = {"file": (wav_path.name, f, "audio/wav")}
-                data = {"model": WHISPER_MODEL, "language": WHISPER_LANGUAGE}
-                resp = session.post(WHISPER_API_URL, files=files, data=data, timeout=30)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=WHISPER_WORKERS, pool_maxsize=WHISPER_WORKERS)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if WHISPER_API_KEY:
+            session.headers["Authorization"] = f"Bearer {WHISPER_API_KEY}"
+        _whisper_local.session = session
+    return session
 
-            resp.raise_for_status()
-            text = resp.json().get("text", "").strip()
 
-            txt_path.write_text(text, encoding="utf-8")
-            log.info("Transcription [%s]: %s", wav_path.name, text[:120])
+def _transcribe(wav_path: Path):
+    """Send one WAV file to the Whisper API and save the text next to it."""
+    import requests
 
-        except requests.exceptions.ConnectionError:
-            log.error("Whisper API unreachable: %s", WHISPER_API_URL)
-        except requests.exceptions.Timeout:
-            log.error("Whisper API timeout for %s", wav_path.name)
-        except Exception:
-            log.exception("Transcription failed for %s", wav_path.name)
-        finally:
-            transcription_queue.task_done()
+    txt_path = wav_path.with_suffix(".txt")
+    try:
+        with open(wav_path, "rb") as f:
+            files = {"file": (wav_path.name, f, "audio/wav")}
+            data = {"model": WHISPER_MODEL, "language": WHISPER_LANGUAGE}
+            resp = _whisper_session().post(WHISPER_API_URL, files=files, data=data, timeout=30)
+
+        resp.raise_for_status()
+        text = resp.json().get("text", "").strip()
+
+        txt_path.write_text(text, encoding="utf-8")
+        log.info("Transcription [%s]: %s", wav_path.name, text[:120])
+
+    except requests.exceptions.ConnectionError:
+        log.error("Whisper API unreachable: %s", WHISPER_API_URL)
+    except requests.exceptions.Timeout:
+        log.error("Whisper API timeout for %s", wav_path.name)
+    except Exception:
+        log.exception("Transcription failed for %s", wav_path.name)
+
+
+def _transcribe_worker():
+    """Daemon thread: dispatches WAV files from the queue to a pool of uploaders."""
+    with ThreadPoolExecutor(max_workers=WHISPER_WORKERS, thread_name_prefix="whisper") as pool:
+        while True:
+            item = transcription_queue.get()
+            if item is _SENTINEL:
+                break
+            future = pool.submit(_transcribe, item)
+            future.add_done_callback(lambda _f: transcription_queue.task_done())
 
 
 def start_transcription_worker() -> threading.Thread:
@@ -140,36 +170,217 @@ def stop_transcription_worker():
 # ---------------------------------------------------------------------------
 
 SILERO_MODEL_PATH = os.environ.get("SILERO_MODEL_PATH", "/opt/silero/silero_vad.onnx")
+SILERO_CACHE_DIR = os.environ.get("SILERO_CACHE_DIR", "/data")
+# Comma-separated ORT execution providers, or "auto" to take the best available.
+SILERO_PROVIDERS = os.environ.get("SILERO_PROVIDERS", "CPUExecutionProvider")
+
+_PREFERRED_PROVIDERS = ("CUDAExecutionProvider", "OpenVINOExecutionProvider", "CPUExecutionProvider")
+
+
+def _select_providers() -> list[str]:
+    """Execution providers to request, restricted to those ORT actually has."""
+    if SILERO_PROVIDERS.strip().lower() == "auto":
+        wanted = _PREFERRED_PROVIDERS
+    else:
+        wanted = [p.strip() for p in SILERO_PROVIDERS.split(",") if p.strip()]
+    available = ort.get_available_providers()
+    return [p for p in wanted if p in available] or ["CPUExecutionProvider"]
+
+
+def _cache_path(model_path: str, suffix: str) -> Optional[str]:
+    """Location of a file derived from *model_path* in the cache directory.
+
+    The name embeds the source model's size and mtime so an image update
+    with a new model never picks up a stale cache. Returns None when the
+    cache directory is not writable (e.g. local runs outside the add-on).
+    """
+    if not os.access(SILERO_CACHE_DIR, os.W_OK):
+        return None
+    st = os.stat(model_path)
+    stem = Path(model_path).stem
+    return os.path.join(SILERO_CACHE_DIR, f"{stem}.{st.st_size}.{int(st.st_mtime)}.{suffix}")
+
+
+def _optimized_model_path(model_path: str) -> Optional[str]:
+    """Location of the serialized optimized graph for *model_path*."""
+    return _cache_path(model_path, "ort")
+
+
+def _constants_to_initializers(graph):
+    """Move Constant-node tensors into initializers so the quantizer sees them.
+
+    Silero keeps its weights as Constant nodes inside If branches, which
+    ``quantize_dynamic`` would otherwise skip entirely.
+    """
+    from onnx import AttributeProto
+
+    nodes = []
+    for node in graph.node:
+        if node.op_type == "Constant" and [a.name for a in node.attribute] == ["value"]:
+            tensor = graph.initializer.add()
+            tensor.CopyFrom(node.attribute[0].t)
+            tensor.name = node.output[0]
+            continue
+        for attr in node.attribute:
+            if attr.type == AttributeProto.GRAPH:
+                _constants_to_initializers(attr.g)
+        nodes.append(node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+
+
+def _quantized_model_path(model_path: str) -> Optional[str]:
+    """Dynamic-int8 copy of *model_path*, created in the cache dir on first use.
+
+    Returns None (keep the FP32 model) when there is nowhere to store it or
+    the quantization tooling is unavailable.
+    """
+    target = _cache_path(model_path, "int8.onnx")
+    if target is None or os.path.isfile(target):
+        return target
+    try:
+        import onnx
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        return None
+
+    log.info("Quantizing Silero VAD to int8 (one-time) …")
+    model = onnx.load(model_path)
+    _constants_to_initializers(model.graph)
+    prepared, quantized = target + ".prep.tmp", target + ".tmp"
+    try:
+        onnx.save(model, prepared)
+        quantize_dynamic(prepared, quantized, weight_type=QuantType.QUInt8,
+                         extra_options={"EnableSubgraph": True})
+        os.replace(quantized, target)
+    finally:
+        for tmp in (prepared, quantized):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return target
+
+
+def _rename_graph_input(graph, old: str, new: str):
+    """Point every consumer of *old* (including nested If/Loop bodies) at *new*."""
+    from onnx import AttributeProto
+
+    for node in graph.node:
+        node.input[:] = [new if name == old else name for name in node.input]
+        for attr in node.attribute:
+            if attr.type == AttributeProto.GRAPH:
+                _rename_graph_input(attr.g, old, new)
+            elif attr.type == AttributeProto.GRAPHS:
+                for sub in attr.graphs:
+                    _rename_graph_input(sub, old, new)
+
+
+def _with_int16_input(model_path: str) -> Optional[bytes]:
+    """Re-export the Silero graph so that ``input`` takes raw s16le PCM.
+
+    A Cast + Mul(1/32768) pair is fused in front of the original float
+    input, letting the hot loop bind PCM straight from the FFmpeg pipe
+    without a per-chunk float32 conversion. Returns None (keep the float
+    model) when the ``onnx`` package is unavailable or the graph already
+    takes integers.
+    """
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError:
+        log.warning("onnx package not installed – PCM is converted to float32 in Python.")
+        return None
+
+    model = onnx.load(model_path)
+    graph = model.graph
+    inp = next(i for i in graph.input if i.name == "input")
+    if inp.type.tensor_type.elem_type != TensorProto.FLOAT:
+        return None
+
+    _rename_graph_input(graph, "input", "input_f32")
+    inp.type.tensor_type.elem_type = TensorProto.INT16
+    graph.initializer.append(
+        numpy_helper.from_array(np.array(1.0 / 32768.0, dtype=np.float32), "pcm_scale"))
+    graph.node.insert(0, helper.make_node("Cast", ["input"], ["pcm_f32"], to=TensorProto.FLOAT))
+    graph.node.insert(1, helper.make_node("Mul", ["pcm_f32", "pcm_scale"], ["input_f32"]))
+    return model.SerializeToString()
 
 
 class SileroVAD:
-    """Lightweight wrapper around the Silero VAD ONNX model."""
+    """Lightweight wrapper around the Silero VAD ONNX model.
+
+    Inputs and outputs are bound once through an ``IoBinding`` to preallocated
+    numpy buffers, so every call reuses the same memory instead of rebuilding
+    the feed dict and letting ORT allocate fresh output tensors.
+
+    When the graph takes int16 (see ``_with_int16_input``), ``takes_pcm`` is
+    set and chunks are passed as raw PCM instead of float32 samples.
+    """
 
     def __init__(self, model_path: str):
+        # Leave a core for FFmpeg; a second intra-op thread helps on multi-core
+        # hosts, more only adds synchronization cost for a 512-sample model.
         opts = ort.SessionOptions()
         opts.inter_op_num_threads = 1
-        opts.intra_op_num_threads = 1
-        self._session = ort.InferenceSession(model_path, sess_options=opts)
+        opts.intra_op_num_threads = min(2, max(1, (os.cpu_count() or 1) - 1))
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.enable_mem_pattern = True
+        opts.enable_cpu_mem_arena = True
+        opts.log_severity_level = 3
+
+        providers = _select_providers()
+
+        # Optimize once and reuse the serialized graph on later starts. The
+        # fused kernels are provider-specific, so only the CPU graph is cached.
+        cached = _optimized_model_path(model_path) if providers[0] == "CPUExecutionProvider" else None
+        if cached and os.path.isfile(cached):
+            source = cached
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        else:
+            source = _with_int16_input(model_path) or model_path
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if cached:
+                opts.optimized_model_filepath = cached
+        self._session = ort.InferenceSession(source, sess_options=opts, providers=providers)
+
+        input_type = next(i.type for i in self._session.get_inputs() if i.name == "input")
+        self.takes_pcm = input_type == "tensor(int16)"
+
+        self._input = np.zeros(
+            (1, CHUNK_SAMPLES), dtype=np.int16 if self.takes_pcm else np.float32)
+        self._sr = np.array([SAMPLE_RATE], dtype=np.int64)
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._out = np.zeros((1, 1), dtype=np.float32)
+        self._state_out = np.zeros_like(self._state)
+
+        out_name, state_out_name = (o.name for o in self._session.get_outputs())
+        self._io = self._session.io_binding()
+        for name, buf in (("input", self._input), ("sr", self._sr), ("state", self._state)):
+            self._io.bind_ortvalue_input(name, ort.OrtValue.ortvalue_from_numpy(buf))
+        for name, buf in ((out_name, self._out), (state_out_name, self._state_out)):
+            self._io.bind_ortvalue_output(name, ort.OrtValue.ortvalue_from_numpy(buf))
 
+        self._call_count = 0
         self.reset_states()
-        log.info("Silero VAD ONNX model loaded from %s", model_path)
+        log.info("Silero VAD ONNX model loaded from %s (%s input, %s, %d intra-op threads)",
+                 model_path, "int16" if self.takes_pcm else "float32",
+                 self._session.get_providers()[0], opts.intra_op_num_threads)
 
     def reset_states(self):
-        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        # Zero in place – the bound OrtValue points at this buffer.
+        self._state.fill(0.0)
 
     def __call__(self, audio_chunk: np.ndarray) -> float:
-        ort_inputs = {
-            "input": audio_chunk.reshape(1, -1).astype(np.float32),
-            "sr": np.array([SAMPLE_RATE], dtype=np.int64),
-            "state": self._state,
-        }
-        out, self._state = self._session.run(None, ort_inputs)
-        prob = float(out.squeeze())
-        self._call_count = getattr(self, "_call_count", 0) + 1
+        np.copyto(self._input[0], audio_chunk)
+        self._session.run_with_iobinding(self._io)
+        np.copyto(self._state, self._state_out)
+        prob = float(self._out[0, 0])
+        self._call_count += 1
         if self._call_count <= 100 or self._call_count % 300 == 0:
+            rms = float(np.sqrt(np.mean(np.square(audio_chunk, dtype=np.float32))))
+            if self.takes_pcm:
+                rms *= _INV32768
             log.debug("VAD chunk #%d: prob=%.4f  audio_rms=%.4f",
-                       self._call_count, prob,
-                       float(np.sqrt(np.mean(audio_chunk ** 2))))
+                       self._call_count, prob, rms)
         return prob
 
 
@@ -178,6 +389,11 @@ def load_vad_model() -> SileroVAD:
     if not os.path.isfile(path):
         log.error("ONNX model not found at %s", path)
         sys.exit(1)
+    if VAD_INT8:
+        try:
+            path = _quantized_model_path(path) or path
+        except Exception:
+            log.exception("int8 quantization failed – using the FP32 model.")
     return SileroVAD(path)
 
 
@@ -216,22 +432,113 @@ def start_ffmpeg(rtsp_url: str) -> subprocess.Popen:
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFSIZE,
     )
     t = threading.Thread(target=_stderr_drain, args=(proc.stderr,), daemon=True)
     t.start()
     return proc
 
 
+_INV32768 = np.float32(1.0 / 32768.0)
+_AUDIO_BUF = np.empty(READ_CHUNKS * CHUNK_SAMPLES, dtype=np.float32)
+
+
 def pcm_to_float(pcm_bytes: bytes) -> np.ndarray:
-    return np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    """Convert up to READ_CHUNKS whole s16le chunks to float32 in one pass.
+
+    Returns a ``(n_chunks, CHUNK_SAMPLES)`` view of a shared module-level
+    buffer that is overwritten on the next call – copy it if it has to
+    outlive the current block.
+    """
+    pcm = np.frombuffer(pcm_bytes, dtype=np.int16)
+    out = _AUDIO_BUF[:pcm.size]
+    np.multiply(pcm, _INV32768, out=out)
+    return out.reshape(-1, CHUNK_SAMPLES)
+
+
+def _pipe_reader(stream, blocks: Queue):
+    """Daemon thread: reads whole-chunk PCM blocks from FFmpeg into *blocks*.
+
+    The queue is bounded, so a slow VAD loop back-pressures the reader
+    instead of buffering unbounded audio. A sentinel marks end of stream.
+
+    Reads go straight into a fixed pool of preallocated buffers that are
+    handed out as memoryviews, so the read side allocates nothing per block.
+    The pool holds two more slots than the queue (one being filled, one
+    still in use by the consumer), so a slot is never overwritten early.
+    """
+    pool = [memoryview(bytearray(READ_BYTES)) for _ in range(READ_QUEUE_BLOCKS + 2)]
+    slot = 0
+    filled = 0
+    try:
+        while True:
+            view = pool[slot]
+            n = stream.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+            whole = filled - filled % CHUNK_BYTES
+            if not whole:
+                continue
+            blocks.put(view[:whole])
+            slot = (slot + 1) % len(pool)
+            filled -= whole
+            if filled:
+                pool[slot][:filled] = view[whole:whole + filled]
+    except (OSError, ValueError):
+        pass  # pipe closed under us during shutdown
+    finally:
+        blocks.put(_SENTINEL)
+
+
+def iter_chunks(blocks: Queue, as_float: bool = True):
+    """Yield ``(raw, audio)`` per chunk from the blocks queued by the reader.
+
+    ``raw`` is the chunk's PCM memoryview and ``audio`` the matching row of
+    model input. With *as_float* every block is converted with a single
+    ``pcm_to_float`` call, whose buffer is overwritten by the next block –
+    copy it if it has to be kept; otherwise ``audio`` is an int16 view of
+    the PCM itself.
+    """
+    while True:
+        block = blocks.get()
+        if block is _SENTINEL:
+            return
+        if as_float:
+            audio = pcm_to_float(block)
+        else:
+            audio = np.frombuffer(block, dtype=np.int16).reshape(-1, CHUNK_SAMPLES)
+        for i, off in enumerate(range(0, len(block), CHUNK_BYTES)):
+            yield block[off:off + CHUNK_BYTES], audio[i]
+
+
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def wav_header(data_size: int) -> bytes:
+    """44-byte RIFF/WAVE header for *data_size* bytes of mono s16le PCM."""
+    return _WAV_HEADER.pack(
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * BYTES_PER_SAMPLE,
+        BYTES_PER_SAMPLE, BYTES_PER_SAMPLE * 8,
+        b"data", data_size,
+    )
 
 
-def save_wav(pcm_data: bytearray, filepath: Path):
-    with wave.open(str(filepath), "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(BYTES_PER_SAMPLE)
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(pcm_data)
+def save_wav(pcm_data: bytes, filepath: Path):
+    """Write header + PCM with a single ``writev`` and fsync the file."""
+    parts = [memoryview(wav_header(len(pcm_data))), memoryview(pcm_data)]
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while parts:
+            n = os.writev(fd, parts)
+            while parts and n >= len(parts[0]):
+                n -= len(parts.pop(0))
+            if parts:
+                parts[0] = parts[0][n:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
     duration = len(pcm_data) / BYTES_PER_SAMPLE / SAMPLE_RATE
     log.info("Saved %s  (%.1f s)", filepath.name, duration)
 
@@ -251,26 +558,99 @@ def _close_ffmpeg(proc: subprocess.Popen):
         pass
 
 
+# ---------------------------------------------------------------------------
+# WAV writer (runs in a separate thread)
+# ---------------------------------------------------------------------------
+WAV_QUEUE_SIZE = 4
+
+wav_queue: Queue[tuple[memoryview, int, str]] = Queue(maxsize=WAV_QUEUE_SIZE)
+
+# Speech slabs are handed to the writer without copying and come back here
+# once written; at most WAV_QUEUE_SIZE + 2 are ever alive.
+free_slabs: Queue[memoryview] = Queue()
+
+
+def take_slab() -> memoryview:
+    """Return a recycled speech slab, allocating a new one only if none is free."""
+    try:
+        return free_slabs.get_nowait()
+    except Empty:
+        return memoryview(bytearray(SPEECH_SLAB_BYTES))
+
+
+def _wav_writer():
+    """Daemon thread: saves finished recordings so disk I/O never stalls VAD.
+
+    A file is queued for transcription only after it has been fsynced.
+    """
+    while True:
+        item = wav_queue.get()
+        if item is _SENTINEL:
+            break
+
+        slab, length, path = item
+        filepath = Path(path)
+        try:
+            save_wav(slab[:length], filepath)
+            if WHISPER_ENABLED:
+                transcription_queue.put(filepath)
+        except Exception:
+            log.exception("Failed to save %s", filepath.name)
+        finally:
+            free_slabs.put(slab)
+            wav_queue.task_done()
+
+
+def start_wav_writer() -> threading.Thread:
+    t = threading.Thread(target=_wav_writer, daemon=True, name="wav-writer")
+    t.start()
+    return t
+
+
+def stop_wav_writer():
+    wav_queue.put(_SENTINEL)
+
+
 # ---------------------------------------------------------------------------
 # Main processing loop
 # ---------------------------------------------------------------------------
 
 
-def _flush_recording(speech_buffer: bytearray, model: SileroVAD, reason: str):
-    """Save the current recording buffer, queue transcription, reset state."""
-    total_samples = len(speech_buffer) // BYTES_PER_SAMPLE
-    if total_samples >= MIN_SPEECH_SAMPLES:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = OUTPUT_DIR / f"{CAMERA_NAME}_{ts}.wav"
-        save_wav(speech_buffer, filepath)
-        log.info("Flush reason: %s", reason)
+def _peak(raw: memoryview) -> int:
+    """Peak absolute amplitude of an s16le chunk."""
+    pcm = np.frombuffer(raw, dtype=np.int16)
+    return max(int(pcm.max()), -int(pcm.min()))
 
-        if WHISPER_ENABLED:
-            transcription_queue.put(filepath)
-    else:
-        log.debug("Discarding short segment (%.2f s).", total_samples / SAMPLE_RATE)
-    speech_buffer.clear()
+
+def _unroll_pre_padding(ring: memoryview, head: int, count: int, dest: memoryview) -> int:
+    """Copy the *count* newest ring slots into *dest*, oldest first.
+
+    This is at most two slice copies regardless of how many chunks are
+    buffered. Returns the number of bytes written.
+    """
+    oldest = (head - count) % PRE_PADDING_CHUNKS * CHUNK_BYTES
+    size = count * CHUNK_BYTES
+    first = min(oldest + size, len(ring)) - oldest
+    dest[:first] = ring[oldest:oldest + first]
+    dest[first:size] = ring[:size - first]
+    return size
+
+
+def _flush_recording(slab: memoryview, length: int, model: SileroVAD, reason: str) -> memoryview:
+    """Hand the first *length* bytes of *slab* to the WAV writer, reset state.
+
+    The slab itself is passed on without a copy, so the caller continues
+    with the returned slab and rewinds its write cursor.
+    """
+    total_samples = length // BYTES_PER_SAMPLE
     model.reset_states()
+    if total_samples >= MIN_SPEECH_SAMPLES:
+        ts = time.strftime("%Y%m%d_%H%M%S", time.localtime())
+        wav_queue.put((slab, length, f"{OUTPUT_DIR}/{CAMERA_NAME}_{ts}.wav"))
+        log.info("Flush reason: %s", reason)
+        return take_slab()
+    log.debug("Discarding short segment (%.2f s).", total_samples / SAMPLE_RATE)
+    return slab
 
 
 def process_stream(model: SileroVAD):
@@ -278,23 +658,34 @@ def process_stream(model: SileroVAD):
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     ffmpeg = start_ffmpeg(RTSP_URL)
-
-    pre_buffer: deque[bytes] = deque(maxlen=PRE_PADDING_CHUNKS)
-    speech_buffer = bytearray()
+    blocks: Queue[memoryview] = Queue(maxsize=READ_QUEUE_BLOCKS)
+    reader = threading.Thread(
+        target=_pipe_reader, args=(ffmpeg.stdout, blocks), daemon=True, name="ffmpeg-reader",
+    )
+    reader.start()
+
+    # Pre-speech padding kept as a fixed ring of PRE_PADDING_CHUNKS slots.
+    pre_ring = memoryview(bytearray(PRE_PADDING_CHUNKS * CHUNK_BYTES))
+    pre_head = 0
+    pre_count = 0
+    # Speech is written into a slab sized for the longest possible recording,
+    # so appends never reallocate; speech_len is the write cursor.
+    speech_view = take_slab()
+    speech_len = 0
     silence_count = 0
     idle_count = 0
     is_recording = False
 
     try:
-        while running:
-            raw = ffmpeg.stdout.read(CHUNK_BYTES)
-
-            if not raw or len(raw) < CHUNK_BYTES:
-                log.warning("FFmpeg stream ended or incomplete read.")
+        for raw, audio in iter_chunks(blocks, as_float=not model.takes_pcm):
+            if not running:
                 break
 
-            audio = pcm_to_float(raw)
-            speech_prob = model(audio)
+            # While idle, near-silent chunks cannot start speech: skip inference.
+            if not is_recording and ENERGY_GATE and _peak(raw) < ENERGY_GATE:
+                speech_prob = 0.0
+            else:
+                speech_prob = model(audio)
 
             if speech_prob >= VAD_THRESHOLD:
                 idle_count = 0
@@ -306,38 +697,59 @@ def process_stream(model: SileroVAD):
                         VAD_THRESHOLD,
                     )
                     is_recording = True
-                    for chunk in pre_buffer:
-                        speech_buffer.extend(chunk)
-                    pre_buffer.clear()
+                    speech_len = _unroll_pre_padding(pre_ring, pre_head, pre_count, speech_view)
+                    pre_head = pre_count = 0
 
-                speech_buffer.extend(raw)
+                speech_view[speech_len:speech_len + CHUNK_BYTES] = raw
+                speech_len += CHUNK_BYTES
                 silence_count = 0
 
-                if len(speech_buffer) >= MAX_RECORDING_BYTES:
-                    _flush_recording(speech_buffer, model, "max duration reached")
+                if speech_len >= MAX_RECORDING_BYTES:
+                    speech_view = _flush_recording(
+                        speech_view, speech_len, model, "max duration reached")
+                    speech_len = 0
                     is_recording = False
 
             else:
                 if is_recording:
-                    speech_buffer.extend(raw)
+                    speech_view[speech_len:speech_len + CHUNK_BYTES] = raw
+                    speech_len += CHUNK_BYTES
                     silence_count += 1
 
-                    if silence_count >= POST_PADDING_CHUNKS:
-                        _flush_recording(speech_buffer, model, "silence timeout")
+                    if silence_count >= POST_PADDING_CHUNKS or speech_len >= MAX_RECORDING_BYTES:
+                        reason = (
+                            "silence timeout" if silence_count >= POST_PADDING_CHUNKS
+                            else "max duration reached"
+                        )
+                        speech_view = _flush_recording(speech_view, speech_len, model, reason)
+                        speech_len = 0
                         silence_count = 0
                         is_recording = False
                         idle_count = 0
                 else:
-                    pre_buffer.append(raw)
+                    off = pre_head * CHUNK_BYTES
+                    pre_ring[off:off + CHUNK_BYTES] = raw
+                    pre_head = (pre_head + 1) % PRE_PADDING_CHUNKS
+                    pre_count = min(pre_count + 1, PRE_PADDING_CHUNKS)
                     idle_count += 1
                     if idle_count >= IDLE_RESET_CHUNKS:
                         model.reset_states()
                         idle_count = 0
+        else:
+            log.warning("FFmpeg stream ended or incomplete read.")
 
     finally:
-        if is_recording and len(speech_buffer) > 0:
-            _flush_recording(speech_buffer, model, "stream ended while recording")
+        if is_recording and speech_len > 0:
+            speech_view = _flush_recording(
+                speech_view, speech_len, model, "stream ended while recording")
+        free_slabs.put(speech_view)
         _close_ffmpeg(ffmpeg)
+        # Unblock a reader stuck on a full queue so it can post its sentinel.
+        while reader.is_alive():
+            try:
+                blocks.get(timeout=0.1)
+            except Empty:
+                pass
 
 
 # ---------------------------------------------------------------------------
@@ -354,6 +766,8 @@ def main():
 
     log.info("Configuration:")
     log.info("  VAD threshold     : %.2f", VAD_THRESHOLD)
+    log.info("  VAD int8 model    : %s", "enabled" if VAD_INT8 else "disabled")
+    log.info("  Energy gate       : %d", ENERGY_GATE)
     log.info("  Pre-padding       : %.2f s  (%d chunks)", PRE_PADDING_S, PRE_PADDING_CHUNKS)
     log.info("  Post-padding      : %.2f s  (%d chunks)", POST_PADDING_S, POST_PADDING_CHUNKS)
     log.info("  Min speech        : %.2f s", MIN_SPEECH_S)
@@ -367,6 +781,7 @@ def main():
         start_transcription_worker()
 
     model = load_vad_model()
+    start_wav_writer()
 
     while running:
         try:
@@ -385,6 +800,9 @@ def main():
 
         model.reset_states()
 
+    wav_queue.join()
+    stop_wav_writer()
+
     if WHISPER_ENABLED:
         log.info("Waiting for pending transcriptions …")
         transcription_queue.join()
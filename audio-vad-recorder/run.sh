@@ -11,6 +11,8 @@ fi
 export RTSP_URL=$(jq -r '.rtsp_url' "$CONFIG")
 export CAMERA_NAME=$(jq -r '.camera_name // "kamera"' "$CONFIG")
 export VAD_THRESHOLD=$(jq -r '.vad_threshold // 0.7' "$CONFIG")
+export VAD_INT8=$(jq -r 'if .vad_int8 == false then "false" else "true" end' "$CONFIG")
+export ENERGY_GATE=$(jq -r '.energy_gate // 200' "$CONFIG")
 export PRE_PADDING=$(jq -r '.pre_padding // 0.5' "$CONFIG")
 export POST_PADDING=$(jq -r '.post_padding // 1.5' "$CONFIG")
 export MIN_SPEECH_DURATION=$(jq -r '.min_speech_duration // 0.5' "$CONFIG")
@@ -30,6 +32,8 @@ fi
 echo "[INFO] Starting Audio VAD Recorder"
 echo "[INFO]   Camera         : ${CAMERA_NAME}"
 echo "[INFO]   VAD Threshold  : ${VAD_THRESHOLD}"
+echo "[INFO]   VAD int8 model : ${VAD_INT8}"
+echo "[INFO]   Energy gate    : ${ENERGY_GATE}"
 echo "[INFO]   Pre-padding    : ${PRE_PADDING}s"
 echo "[INFO]   Post-padding   : ${POST_PADDING}s"
 echo "[INFO]   Min speech     : ${MIN_SPEECH_DURATION}s"
@@ -1,20 +1,48 @@
+import hashlib
 import logging
 import os
 import shutil
+import socket
+import ssl
+import struct
 import subprocess
 import sys
 import tempfile
+import threading
 import time
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator
 
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 
 MAX_RETRIES = 3
 RETRY_DELAY_S = 10
 READ_TIMEOUT_S = 1200
 CHUNK_COOLDOWN_S = int(os.environ.get("CHUNK_COOLDOWN", "5"))
+CHUNK_WORKERS = max(1, int(os.environ.get("CHUNK_WORKERS", "2")))
+EXPORT_CHUNK_HOURS = min(6, max(1, int(os.environ.get("EXPORT_CHUNK_HOURS", "1"))))
+STREAM_CHUNKS = os.environ.get("STREAM_CHUNKS", "true").lower() == "true"
+STREAM_CHUNK_BYTES = 4 * 1024 * 1024
+EXPORT_RCVBUF_BYTES = 4 * 1024 * 1024
+LOCAL_BATCH_SIZE = 8
+WHISPER_WORKERS = max(1, int(os.environ.get("WHISPER_WORKERS", "4")))
+# 10 minutes of 16 kHz mono s16 is ~19 MB, under the API's 25 MB upload cap.
+WHISPER_SEGMENT_S = 600
+WHISPER_RETRY_STATUSES = (429, 500, 502, 503, 504)
+WHISPER_MAX_UPLOAD_BYTES = 25 * 1000 * 1000
+LOCAL_WHISPER_MODEL_DIR = "/data/whisper_models"
+LOCAL_WHISPER_BATCH_SIZE = 16
+UPLOAD_BLOCK_BYTES = 64 * 1024
+TMPFS_ROOT = "/dev/shm"
+TMPFS_MIN_FREE_BYTES = 2 * 1024 * 1024 * 1024
 
 
 UNIFI_BASE_URL = os.environ.get("UNIFI_BASE_URL", "").rstrip("/")
@@ -28,6 +56,8 @@ WHISPER_API_URL = os.environ.get("WHISPER_API_URL", "https://api.openai.com/v1/a
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "whisper-1")
 WHISPER_LANGUAGE = os.environ.get("WHISPER_LANGUAGE", "pl")
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "api").lower()
+LOCAL_WHISPER_MODEL = os.environ.get("LOCAL_WHISPER_MODEL", "small")
 EXPORT_AUDIO_DIR = Path(os.environ.get("EXPORT_AUDIO_DIR", "/share/unifi_protect_audio"))
 KEEP_AUDIO_FILES = os.environ.get("KEEP_AUDIO_FILES", "true").lower() == "true"
 LOCAL_INPUT_DIR = os.environ.get("LOCAL_INPUT_DIR", "").strip()
@@ -39,7 +69,13 @@ SUPERVISOR_TOKEN = os.environ.get("SUPERVISOR_TOKEN", "")
 
 UNIFI_EXPORT_PATH = "/proxy/protect/api/video/export"
 HA_NOTIFY_ENDPOINT = "http://supervisor/core/api/services/persistent_notification/create"
-CHUNK_DURATION = timedelta(hours=1)
+HOUR_MS = 60 * 60 * 1000
+# Longest export span the NVR accepted, kept beside the audio so it outlives
+# the chunk cache.
+EXPORT_SPAN_FILE = EXPORT_AUDIO_DIR / ".max_export_hours"
+# Export statuses that mean the requested span was too long. Others, such as
+# a 404 for a gap in the recording, fail the chunk without shrinking spans.
+SPAN_TOO_LONG_STATUSES = frozenset({400, 413, 422})
 
 if not VERIFY_TLS:
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -53,12 +89,77 @@ logging.basicConfig(
 log = logging.getLogger("unifi-historical-transcriber")
 
 
+# Whisper can sit silent for minutes while it transcribes a segment; TCP
+# keep-alive probes stop NAT/conntrack from dropping the connection meanwhile
+# and notice a dead peer long before the read timeout.
+_KEEPALIVE_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 6))
+    if hasattr(socket, name)
+]
+
+
+class _UploadAdapter(HTTPAdapter):
+    """Reads streamed request bodies in 64 KiB blocks instead of urllib3's 16 KiB,
+    so a MultipartEncoder upload takes a quarter of the Python-level reads."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["blocksize"] = UPLOAD_BLOCK_BYTES
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + _KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Shared keep-alive pool for Whisper and HA calls, so each request skips the
+# TCP + TLS handshake.
+_HTTP = requests.Session()
+_HTTP.mount("https://", _UploadAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, read=False, backoff_factor=0.5),
+))
+_HTTP.mount("http://", _UploadAdapter(pool_connections=2, pool_maxsize=4))
+
+
 class AuthError(Exception):
     pass
 
 
+# ffmpeg's complaint when "-map 0:a:0" finds no audio stream.
+_NO_AUDIO_ERROR = "matches no streams"
+
+
+class TokenExpired(Exception):
+    """The NVR rejected the session's TOKEN cookie; a fresh login may fix it."""
+
+
+class ExportRejected(Exception):
+    """The NVR answered an export request with a 4xx other than 401/403."""
+
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+    @property
+    def span_too_long(self) -> bool:
+        return self.status in SPAN_TOO_LONG_STATUSES
+
+
+class StreamUnsupported(Exception):
+    pass
+
+
+# Set once ffmpeg has failed to read an export from a pipe; later chunks go
+# straight to the MP4 download path instead of fetching everything twice.
+_stream_unsupported = threading.Event()
+
+
+# Credentials come from the environment once, so the auth mode is fixed too.
+_USE_API_KEY = bool(UNIFI_API_KEY)
+_AUTH_MODE = "api_key" if _USE_API_KEY else "cookie_token"
+
+
 def use_api_key_auth() -> bool:
-    return bool(UNIFI_API_KEY)
+    return _USE_API_KEY
 
 
 # ---------------------------------------------------------------------------
@@ -85,13 +186,57 @@ def unifi_login(session: requests.Session) -> str:
     return token
 
 
+# One TLS context for every UniFi connection instead of one per pool.
+_UNIFI_SSL_CONTEXT = ssl.create_default_context()
+if not VERIFY_TLS:
+    _UNIFI_SSL_CONTEXT.check_hostname = False
+    _UNIFI_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+
+class _ExportAdapter(HTTPAdapter):
+    """Shared TLS context plus a large socket receive buffer, so multi-hundred-MB
+    exports take fewer recv() calls. TCP_NODELAY comes with urllib3's defaults."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _UNIFI_SSL_CONTEXT
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, EXPORT_RCVBUF_BYTES),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+_unifi_local = threading.local()
+
+# Latest TOKEN from any login, so workers that hit the same expiry adopt it
+# instead of each logging in again.
+_reauth_lock = threading.Lock()
+_latest_token = ""
+
+
+def _unifi_session() -> requests.Session:
+    """Per-thread session for chunk workers; the TOKEN lives in its cookie jar."""
+    session = getattr(_unifi_local, "session", None)
+    if session is None:
+        session = _unifi_local.session = requests.Session()
+        # Exports are already-compressed MP4; don't invite gzip on top.
+        session.headers["Accept-Encoding"] = "identity"
+        adapter = _ExportAdapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return session
+
+
 def authenticate_unifi(session: requests.Session) -> str:
     """Returns TOKEN cookie value (credential flow) or empty string (API key flow)."""
-    if use_api_key_auth():
+    global _latest_token
+    if _USE_API_KEY:
         log.info("Using X-API-Key authentication.")
         return ""
 
-    return unifi_login(session)
+    token = unifi_login(session)
+    with _reauth_lock:
+        _latest_token = token
+    return token
 
 
 # ---------------------------------------------------------------------------
@@ -102,6 +247,14 @@ def is_local_mode() -> bool:
     return bool(LOCAL_INPUT_DIR)
 
 
+def iter_mp4s(directory: Path) -> Iterator[Path]:
+    """MP4 files directly in directory; DirEntry type info avoids a stat per name."""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".mp4") and entry.is_file(follow_symlinks=False):
+                yield Path(entry.path)
+
+
 def validate_config() -> None:
     if not is_local_mode():
         if not UNIFI_BASE_URL:
@@ -116,10 +269,9 @@ def validate_config() -> None:
         input_dir = Path(LOCAL_INPUT_DIR)
         if not input_dir.is_dir():
             raise ValueError(f"local_input_dir does not exist: {LOCAL_INPUT_DIR}")
-        mp4s = list(input_dir.glob("*.mp4"))
-        if not mp4s:
+        if next(iter_mp4s(input_dir), None) is None:
             raise ValueError(f"No MP4 files found in {LOCAL_INPUT_DIR}")
-    if WHISPER_ENABLED and not OPENAI_API_KEY:
+    if WHISPER_ENABLED and WHISPER_BACKEND == "api" and not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY is empty")
 
 
@@ -127,62 +279,111 @@ def validate_config() -> None:
 # Time chunking
 # ---------------------------------------------------------------------------
 
-def build_hour_chunks(hours_back: int):
-    end_ts = datetime.now(timezone.utc)
-    start_ts = end_ts - timedelta(hours=hours_back)
+def build_hour_chunks(hours_back: int, span_hours: int = 1) -> Iterator[tuple[int, int]]:
+    """Yields (start_ms, end_ms) epoch-millisecond pairs of span_hours covering the last hours_back hours."""
+    end_ms = int(time.time() * 1000)
+    start_ms = end_ms - hours_back * HOUR_MS
+    for cursor in range(start_ms, end_ms, span_hours * HOUR_MS):
+        yield cursor, min(cursor + span_hours * HOUR_MS, end_ms)
+
+
+def export_span_hours() -> int:
+    """EXPORT_CHUNK_HOURS, capped by the longest span the NVR accepted before."""
+    try:
+        learned = int(EXPORT_SPAN_FILE.read_text())
+    except (OSError, ValueError):
+        return EXPORT_CHUNK_HOURS
+    return max(1, min(EXPORT_CHUNK_HOURS, learned))
+
+
+def span_hours(start_ms: int, end_ms: int) -> int:
+    """Whole hours an export of (start_ms, end_ms) asks for, rounded up."""
+    return -(-(end_ms - start_ms) // HOUR_MS)
+
+
+def reject_export_span(rejected_hours: int, accepted_hours: int = 0) -> None:
+    """Caps later runs below a span the NVR refused, but never below the
+    longest span it accepted, and never raises the cap.
+    """
+    cap = max(1, accepted_hours, rejected_hours - 1)
+    if cap < export_span_hours():
+        EXPORT_SPAN_FILE.parent.mkdir(parents=True, exist_ok=True)
+        EXPORT_SPAN_FILE.write_text(str(cap))
+
+
+def split_export_span(start_ms: int, end_ms: int) -> list[tuple[int, int]]:
+    """Re-splits a rejected (start_ms, end_ms) range into spans of half its length."""
+    step = max(1, span_hours(start_ms, end_ms) // 2) * HOUR_MS
+    return [(cursor, min(cursor + step, end_ms)) for cursor in range(start_ms, end_ms, step)]
+
+
+def _utc(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc)
+
 
-    chunks = []
-    cursor = start_ts
-    while cursor < end_ts:
-        chunk_end = min(cursor + CHUNK_DURATION, end_ts)
-        chunks.append((cursor, chunk_end))
-        cursor = chunk_end
-    return chunks
+def _chunk_cache_name(start_ms: int, end_ms: int) -> str:
+    """Cache file name for a chunk; changing any silence setting changes it too."""
+    key = f"{CAMERA_ID}|{start_ms}|{end_ms}|{_FILTER_EXPR}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".flac"
 
 
 # ---------------------------------------------------------------------------
 # Video download
 # ---------------------------------------------------------------------------
 
-def _do_download(session, url, headers, cookies, params, output_path) -> bool:
-    with session.get(
+def _error_excerpt(resp) -> str:
+    """First 300 bytes of an error body; never reads the rest of a streamed response."""
+    resp.raw.decode_content = True
+    return resp.raw.read(300).decode("utf-8", "replace")
+
+
+@contextmanager
+def _open_export(session, url, headers, params):
+    """Yields the streaming export response, or None after a 5xx API error."""
+    resp = session.get(
         url,
         headers=headers,
-        cookies=cookies,
         params=params,
         stream=True,
         timeout=(15, READ_TIMEOUT_S),
         verify=VERIFY_TLS,
-    ) as resp:
+    )
+    try:
         if resp.status_code in (401, 403):
-            if not use_api_key_auth() and cookies.get("TOKEN"):
-                log.warning("Token may have expired, re-authenticating...")
-                new_token = unifi_login(session)
-                retry_resp = session.get(
-                    url,
-                    cookies={"TOKEN": new_token},
-                    params=params,
-                    stream=True,
-                    timeout=(15, READ_TIMEOUT_S),
-                    verify=VERIFY_TLS,
-                )
-                if retry_resp.status_code < 400:
-                    resp = retry_resp
-                else:
-                    body = retry_resp.text[:300]
-                    raise AuthError(f"HTTP {retry_resp.status_code}: {body}")
-            else:
-                body = resp.text[:300]
-                raise AuthError(f"HTTP {resp.status_code}: {body}")
+            body = _error_excerpt(resp)
+            if not _USE_API_KEY and "TOKEN" in session.cookies:
+                raise TokenExpired(f"HTTP {resp.status_code}: {body}")
+            raise AuthError(f"HTTP {resp.status_code}: {body}")
 
         if resp.status_code >= 400:
-            log.error("UniFi API error %s: %s", resp.status_code, resp.text[:300])
+            log.error("UniFi API error %s: %s", resp.status_code, _error_excerpt(resp))
+            if resp.status_code < 500:
+                raise ExportRejected(resp.status_code)
+            yield None
+        else:
+            yield resp
+    finally:
+        resp.close()
+
+
+def _do_download(session, url, headers, params, output_path) -> bool:
+    with _open_export(session, url, headers, params) as resp:
+        if resp is None:
             return False
 
+        # Straight from urllib3 into the file, no per-piece Python loop.
+        resp.raw.decode_content = True
         with open(output_path, "wb") as f:
-            for piece in resp.iter_content(chunk_size=1024 * 1024):
-                if piece:
-                    f.write(piece)
+            # Reserve the whole export up front so the filesystem can lay it
+            # out in a few extents instead of growing it a block at a time.
+            expected = int(resp.headers.get("Content-Length") or 0)
+            if expected and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, expected)
+                except OSError:
+                    pass
+            shutil.copyfileobj(resp.raw, f, length=STREAM_CHUNK_BYTES)
+            f.truncate()
 
     size = output_path.stat().st_size if output_path.exists() else 0
     if size == 0:
@@ -193,127 +394,479 @@ def _do_download(session, url, headers, cookies, params, output_path) -> bool:
     return True
 
 
-def download_chunk_mp4(
-    session: requests.Session,
-    token: str,
-    chunk_start: datetime,
-    chunk_end: datetime,
-    output_path: Path,
-) -> bool:
+def _do_stream(session, url, headers, params, wav_path) -> bool:
+    with _open_export(session, url, headers, params) as resp, \
+            tempfile.TemporaryFile() as err:
+        if resp is None:
+            return False
+
+        # stderr goes to a file so a chatty ffmpeg can never block our writes.
+        proc = subprocess.Popen(
+            _extract_cmd("pipe:0", wav_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=err,
+            bufsize=0,
+        )
+        resp.raw.decode_content = True
+        try:
+            shutil.copyfileobj(resp.raw, proc.stdin, length=STREAM_CHUNK_BYTES)
+        except BrokenPipeError:
+            pass
+        finally:
+            proc.stdin.close()
+            proc.wait()
+        received = resp.raw.tell()
+
+        if received == 0:
+            log.warning("Downloaded MP4 is empty")
+            return False
+        if proc.returncode != 0:
+            err.seek(0)
+            message = err.read().decode("utf-8", "replace").strip()
+            # ffmpeg gives up as soon as the headers show no audio track, and
+            # closing the response skips the rest of the video.
+            if _NO_AUDIO_ERROR in message:
+                log.info("No audio stream in export for %s, skipping", wav_path.name)
+                return True
+            raise StreamUnsupported(message)
+
+    log.info("Chunk streamed into ffmpeg: %s (%.1f MB)", wav_path.name, received / 1024 / 1024)
+    return True
+
+
+def _export_request(session: requests.Session, token: str, start_ms: int, end_ms: int):
     url = f"{UNIFI_BASE_URL}{UNIFI_EXPORT_PATH}"
-    params = {
-        "camera": CAMERA_ID,
-        "start": int(chunk_start.timestamp() * 1000),
-        "end": int(chunk_end.timestamp() * 1000),
-    }
+    params = {"camera": CAMERA_ID, "start": start_ms, "end": end_ms}
     headers = {}
-    cookies = {}
 
-    if use_api_key_auth():
+    if _USE_API_KEY:
         headers["X-API-Key"] = UNIFI_API_KEY
-    elif token:
-        cookies["TOKEN"] = token
+    elif token and "TOKEN" not in session.cookies:
+        # Seeds the jar only; a token refreshed on this session wins.
+        session.cookies.set("TOKEN", token)
 
-    auth_mode = "api_key" if use_api_key_auth() else "cookie_token"
     log.info(
         "Downloading chunk %s -> %s  (camera=%s, auth=%s)",
-        chunk_start.isoformat(),
-        chunk_end.isoformat(),
+        _utc(start_ms).isoformat(),
+        _utc(end_ms).isoformat(),
         CAMERA_ID,
-        auth_mode,
+        _AUTH_MODE,
     )
+    return url, headers, params
+
+
+def _refresh_token(session: requests.Session) -> None:
+    """Puts a fresh TOKEN into the session's cookie jar for this and later chunks."""
+    global _latest_token
+    stale = session.cookies.get("TOKEN")
+    with _reauth_lock:
+        session.cookies.clear()
+        if _latest_token and _latest_token != stale:
+            session.cookies.set("TOKEN", _latest_token)
+            return
+        log.warning("Token may have expired, re-authenticating...")
+        _latest_token = unifi_login(session)
+
+
+def _attempt_with_reauth(session: requests.Session, output_path: Path, attempt_download) -> bool:
+    for refreshed in (False, True):
+        output_path.unlink(missing_ok=True)
+        try:
+            return attempt_download()
+        except TokenExpired as exc:
+            if refreshed:
+                raise AuthError(str(exc)) from exc
+            _refresh_token(session)
+
 
+def _with_retries(session: requests.Session, start_ms: int, output_path: Path, attempt_download) -> bool:
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            if output_path.exists():
-                output_path.unlink()
-            return _do_download(session, url, headers, cookies, params, output_path)
-        except AuthError:
+            return _attempt_with_reauth(session, output_path, attempt_download)
+        except (AuthError, ExportRejected):
             raise
+        # Bodies are copied from resp.raw, so a dropped or truncated export
+        # surfaces as urllib3's own errors rather than requests' wrappers.
         except (requests.exceptions.ConnectionError,
                 requests.exceptions.Timeout,
-                requests.exceptions.ChunkedEncodingError) as exc:
+                requests.exceptions.ChunkedEncodingError,
+                urllib3.exceptions.ProtocolError,
+                urllib3.exceptions.ReadTimeoutError) as exc:
             log.warning(
                 "Download attempt %d/%d failed: %s. Retrying in %ds...",
                 attempt, MAX_RETRIES, exc, RETRY_DELAY_S * attempt,
             )
-            if output_path.exists():
-                output_path.unlink()
+            output_path.unlink(missing_ok=True)
             if attempt == MAX_RETRIES:
-                log.error("All %d download attempts failed for chunk %s", MAX_RETRIES, chunk_start.isoformat())
+                log.error("All %d download attempts failed for chunk %s", MAX_RETRIES, _utc(start_ms).isoformat())
                 return False
             time.sleep(RETRY_DELAY_S * attempt)
 
     return False
 
 
+def download_chunk_mp4(
+    session: requests.Session,
+    token: str,
+    start_ms: int,
+    end_ms: int,
+    output_path: Path,
+) -> bool:
+    url, headers, params = _export_request(session, token, start_ms, end_ms)
+    return _with_retries(
+        session, start_ms, output_path,
+        lambda: _do_download(session, url, headers, params, output_path),
+    )
+
+
+def stream_chunk_to_wav(
+    session: requests.Session,
+    token: str,
+    start_ms: int,
+    end_ms: int,
+    wav_path: Path,
+) -> bool:
+    """Pipes the export body straight into ffmpeg, so the MP4 never touches disk.
+
+    Raises StreamUnsupported when ffmpeg cannot decode the export from a pipe
+    (e.g. the moov atom is at the end of the file).
+    """
+    url, headers, params = _export_request(session, token, start_ms, end_ms)
+    return _with_retries(
+        session, start_ms, wav_path,
+        lambda: _do_stream(session, url, headers, params, wav_path),
+    )
+
+
+def fetch_chunk_wav(
+    session: requests.Session,
+    token: str,
+    start_ms: int,
+    end_ms: int,
+    mp4_path: Path,
+    wav_path: Path,
+    on_extract=None,
+) -> bool | None:
+    """Downloads one chunk and extracts its speech into wav_path.
+
+    Returns None when the download failed, otherwise whether any speech was kept.
+    """
+    if STREAM_CHUNKS and not _stream_unsupported.is_set():
+        try:
+            if not stream_chunk_to_wav(session, token, start_ms, end_ms, wav_path):
+                return None
+            return _has_speech(wav_path)
+        except StreamUnsupported as exc:
+            _stream_unsupported.set()
+            cleanup_files([wav_path])
+            log.warning("ffmpeg cannot read the export from a pipe, falling back to MP4 downloads: %s", exc)
+
+    if not download_chunk_mp4(session, token, start_ms, end_ms, mp4_path):
+        cleanup_files([mp4_path])
+        return None
+    if on_extract:
+        on_extract()
+    extracted = has_audio_stream(mp4_path) and extract_wav_with_silence_removal(mp4_path, wav_path)
+    cleanup_files([mp4_path])
+    return extracted
+
+
 # ---------------------------------------------------------------------------
 # Audio extraction
 # ---------------------------------------------------------------------------
 
+# None of the silence settings change at runtime, so the ffmpeg command is
+# assembled once and only the input/output paths vary per chunk.
+_FILTER_EXPR = (
+    f"silenceremove="
+    f"start_periods=1:"
+    f"start_duration={START_SILENCE_DURATION}:"
+    f"start_threshold={SILENCE_THRESHOLD_DB}:"
+    f"stop_periods=-1:"
+    f"stop_duration={STOP_SILENCE_DURATION}:"
+    f"stop_threshold={SILENCE_THRESHOLD_DB}"
+)
+# Map only the first audio stream so the video track is never decoded, and
+# drop corrupt packets instead of failing on a truncated export. Extractions
+# already run side by side (chunk workers, local batches), so each process
+# keeps to one decoder and filter thread.
+_EXTRACT_INPUT_ARGS = (
+    "ffmpeg", "-y", "-loglevel", "error",
+    "-filter_threads", "1",
+    "-threads", "1",
+    "-fflags", "+discardcorrupt",
+    "-i",
+)
+_EXTRACT_OUTPUT_ARGS = (
+    "-map", "0:a:0",
+    "-vn", "-sn", "-dn",
+    "-af", _FILTER_EXPR,
+    "-ac", "1",
+    "-ar", "16000",
+)
+# Cached chunks are FLAC: lossless and about half the size of s16 PCM.
+_AUDIO_CODEC_ARGS = {
+    ".wav": ("-c:a", "pcm_s16le"),
+    ".flac": ("-c:a", "flac", "-compression_level", "5"),
+}
+
+
+def _extract_cmd(source: str, wav_path: Path) -> list[str]:
+    return [*_EXTRACT_INPUT_ARGS, source, *_EXTRACT_OUTPUT_ARGS,
+            *_AUDIO_CODEC_ARGS[wav_path.suffix], str(wav_path)]
+
+
+def _run_ffmpeg(cmd) -> tuple[int, bytes]:
+    """Runs ffmpeg with stdout discarded; stderr stays raw bytes until needed."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, err = proc.communicate()
+    return proc.returncode, err
+
+
+def _decode_err(err: bytes) -> str:
+    return err.decode("utf-8", "replace").strip()
+
+
+def _has_samples(audio_path: Path) -> bool:
+    try:
+        with open(audio_path, "rb") as f:
+            head = f.read(44)
+    except FileNotFoundError:
+        return False
+    if head[:4] == b"fLaC":
+        # 36-bit total sample count at the end of STREAMINFO's packed fields.
+        return int.from_bytes(head[18:26], "big") & 0xFFFFFFFFF > 0
+    return audio_path.stat().st_size > 44
+
+
+def _has_speech(wav_path: Path) -> bool:
+    if not _has_samples(wav_path):
+        log.info("No speech found after silenceremove for %s", wav_path.name)
+        return False
+    return True
+
+
 def extract_wav_with_silence_removal(mp4_path: Path, wav_path: Path) -> bool:
-    filter_expr = (
-        f"silenceremove="
-        f"start_periods=1:"
-        f"start_duration={START_SILENCE_DURATION}:"
-        f"start_threshold={SILENCE_THRESHOLD_DB}:"
-        f"stop_periods=-1:"
-        f"stop_duration={STOP_SILENCE_DURATION}:"
-        f"stop_threshold={SILENCE_THRESHOLD_DB}"
+    returncode, err = _run_ffmpeg(_extract_cmd(str(mp4_path), wav_path))
+    if returncode != 0:
+        log.error("ffmpeg failed for %s: %s", mp4_path.name, _decode_err(err))
+        return False
+
+    return _has_speech(wav_path)
+
+
+def has_audio_stream(mp4_path: Path) -> bool:
+    """Reads only the container headers, without decoding anything."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=index", "-of", "csv=p=0", str(mp4_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
     )
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-loglevel",
-        "error",
-        "-i",
-        str(mp4_path),
-        "-vn",
-        "-af",
-        filter_expr,
-        "-ac",
-        "1",
-        "-ar",
-        "16000",
-        str(wav_path),
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        log.error("ffmpeg failed for %s: %s", mp4_path.name, result.stderr.strip())
+    if result.returncode == 0 and not result.stdout.strip():
+        log.info("No audio stream in %s, skipping", mp4_path.name)
         return False
+    return True
 
-    if not wav_path.exists() or wav_path.stat().st_size <= 44:
-        log.info("No speech found after silenceremove for %s", mp4_path.name)
+
+def batched_extract(mp4_paths: list[Path], wav_paths: list[Path]) -> tuple[list[bool], list[Path]]:
+    """Extracts several files with one ffmpeg process into wav_paths[0].
+
+    The inputs are concatenated before silenceremove in a single graph, so a
+    batch costs one process start and codec init and leaves one file for
+    merge_wavs. If the graph fails every file is extracted on its own.
+    Returns per-file success and the wavs written, in order.
+    """
+    # A file without audio would fail the whole graph and force every file
+    # to be decoded a second time, so drop those after a header-only probe.
+    keep = [n for n, p in enumerate(mp4_paths) if len(mp4_paths) == 1 or has_audio_stream(p)]
+    extracted = [False] * len(mp4_paths)
+
+    if len(keep) > 1:
+        ok = _run_batch([mp4_paths[n] for n in keep], wav_paths[0])
+        if ok is not None:
+            for n in keep:
+                extracted[n] = True
+            return extracted, [wav_paths[0]] if ok else []
+
+    wavs = []
+    for n in keep:
+        extracted[n] = extract_wav_with_silence_removal(mp4_paths[n], wav_paths[n])
+        if extracted[n]:
+            wavs.append(wav_paths[n])
+    return extracted, wavs
+
+
+def _run_batch(mp4_paths: list[Path], wav_path: Path) -> bool | None:
+    """Returns whether the joined audio has speech, or None if ffmpeg failed."""
+    # extract_local_files already runs one batch per core, so each process
+    # keeps to a single decoder and filter thread instead of oversubscribing.
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-filter_complex_threads", "1"]
+    for mp4_path in mp4_paths:
+        cmd += ["-threads", "1", "-fflags", "+discardcorrupt", "-i", str(mp4_path)]
+    # concat needs identical audio parameters on every input.
+    cmd += ["-filter_complex", "".join(
+        f"[{n}:a:0]aresample=16000,aformat=sample_fmts=s16:channel_layouts=mono[a{n}];"
+        for n in range(len(mp4_paths))
+    ) + "".join(f"[a{n}]" for n in range(len(mp4_paths))) + (
+        f"concat=n={len(mp4_paths)}:v=0:a=1,{_FILTER_EXPR}[out]"
+    )]
+    cmd += ["-map", "[out]", "-c:a", "pcm_s16le", str(wav_path)]
+
+    returncode, err = _run_ffmpeg(cmd)
+    if returncode != 0:
+        log.warning("Batched ffmpeg failed, extracting files one by one: %s", _decode_err(err))
+        return None
+
+    return _has_speech(wav_path)
+
+
+def extract_local_files(mp4_files: list[Path], tmp: Path, on_batch=None):
+    """Runs batched_extract over mp4_files on one worker per core.
+
+    Batches shrink so every core gets one. Yields (indices, extracted, wavs)
+    per batch in file order; wavs without speech are already removed.
+    """
+    if not mp4_files:
+        return
+    workers = min(os.cpu_count() or 2, len(mp4_files))
+    size = min(LOCAL_BATCH_SIZE, -(-len(mp4_files) // workers))
+    batches = [range(b, min(b + size, len(mp4_files))) for b in range(0, len(mp4_files), size)]
+
+    def _run(idx: range):
+        if on_batch:
+            on_batch(idx.start + 1, idx.stop)
+        wavs = [tmp / f"local_{k + 1:03d}.wav" for k in idx]
+        extracted, kept = batched_extract([mp4_files[k] for k in idx], wavs)
+        cleanup_files([w for w in wavs if w not in kept])
+        return extracted, kept
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+        for idx, (extracted, wavs) in zip(batches, pool.map(_run, batches)):
+            yield idx, extracted, wavs
+
+
+def _wav_layout(wav_path: Path) -> tuple[bytes, int, int]:
+    """Returns (fmt chunk, data offset, data size), skipping LIST and other chunks."""
+    file_size = wav_path.stat().st_size
+    with open(wav_path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:] != b"WAVE":
+            raise ValueError(f"{wav_path.name} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{wav_path.name} has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{wav_path.name} has no fmt chunk")
+                return fmt, f.tell(), min(size, file_size - f.tell())
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                f.seek(size & 1, os.SEEK_CUR)
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _wav_header(fmt: bytes, data_size: int) -> bytes:
+    return (
+        struct.pack("<4sI4s4sI", b"RIFF", 4 + 8 + len(fmt) + 8 + data_size, b"WAVE", b"fmt ", len(fmt))
+        + fmt
+        + struct.pack("<4sI", b"data", data_size)
+    )
+
+
+# PCM, mono, 16 kHz, 32000 B/s, 2-byte frames, 16 bits: what extraction writes.
+_MERGE_PCM_FORMAT = (1, 1, 16000, 32000, 2, 16)
+
+
+def _concat_pcm_wavs(wav_paths, merged_path: Path) -> bool:
+    """Joins the data chunks of WAVs in the extraction format behind one header.
+
+    Returns False without writing anything if an input is in another format
+    or the result would not fit in a RIFF file; ffmpeg handles those.
+    """
+    try:
+        layouts = [_wav_layout(p) for p in wav_paths]
+    except ValueError:
+        return False
+    if any(struct.unpack_from("<HHIIHH", fmt) != _MERGE_PCM_FORMAT for fmt, _, _ in layouts):
+        return False
+    fmt = layouts[0][0][:16]
+    total = sum(size for _, _, size in layouts)
+    if total > 0xFFFFFFFF - 36:
         return False
 
+    with open(merged_path, "wb") as out:
+        out.write(_wav_header(fmt, total))
+        out.flush()
+        for wav_path, (_, offset, size) in zip(wav_paths, layouts):
+            with open(wav_path, "rb") as src:
+                _copy_range(src, out, offset, size)
     return True
 
 
-def merge_wavs(wav_paths, merged_path: Path) -> bool:
+def _copy_range(src, out, offset: int, size: int) -> None:
+    """Appends size bytes of src from offset to out, inside the kernel where possible."""
+    try:
+        while size > 0:
+            sent = os.sendfile(out.fileno(), src.fileno(), offset, min(size, 1 << 30))
+            if sent == 0:
+                return
+            offset += sent
+            size -= sent
+    except (AttributeError, OSError):
+        # No file-to-file sendfile here; finish with ordinary reads.
+        src.seek(offset)
+        while size > 0:
+            block = src.read(min(size, STREAM_CHUNK_BYTES))
+            if not block:
+                return
+            out.write(block)
+            size -= len(block)
+
+
+def merge_wavs(wav_paths, merged_path: Path, tmp: Path) -> bool:
+    """Joins wav_paths, in order, into merged_path; tmp holds ffmpeg's concat list."""
     if not wav_paths:
         return False
 
-    if len(wav_paths) == 1:
-        shutil.copy2(wav_paths[0], merged_path)
+    # Both copies below move the whole recording, possibly hundreds of MB;
+    # the ffmpeg fallback already waits on its process without blocking.
+    if len(wav_paths) == 1 and wav_paths[0].suffix == ".wav":
+        _off_hub(shutil.copyfile, wav_paths[0], merged_path)
         return merged_path.exists() and merged_path.stat().st_size > 44
 
-    concat_list = merged_path.parent / "concat_list.txt"
-    with open(concat_list, "w") as f:
-        for p in wav_paths:
-            f.write(f"file '{p}'\n")
+    # Extracted WAVs already share one PCM format, so joining them is a plain
+    # copy of their samples; only FLAC or odd inputs need an ffmpeg pass.
+    if all(p.suffix == ".wav" for p in wav_paths) and _off_hub(_concat_pcm_wavs, wav_paths, merged_path):
+        return merged_path.stat().st_size > 44
+
+    # Kept out of the export dir, where the web UI would list it as a transcript.
+    concat_list = tmp / "concat_list.txt"
 
     cmd = [
         "ffmpeg", "-y", "-loglevel", "error",
         "-f", "concat", "-safe", "0",
         "-i", str(concat_list),
         "-ac", "1", "-ar", "16000", "-sample_fmt", "s16",
-        str(merged_path),
+        "-f", "wav", str(merged_path),
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    cleanup_files([concat_list])
+    try:
+        # Single-quoted concat entries escape ' as '\''.
+        concat_list.write_text(
+            "".join("file '{}'\n".format(str(p).replace("'", "'\\''")) for p in wav_paths),
+            encoding="utf-8",
+        )
+        returncode, err = _run_ffmpeg(cmd)
+    finally:
+        cleanup_files([concat_list])
 
-    if result.returncode != 0:
-        log.error("ffmpeg merge failed: %s", result.stderr.strip())
+    if returncode != 0:
+        log.error("ffmpeg merge failed: %s", _decode_err(err))
         return False
 
     return merged_path.exists() and merged_path.stat().st_size > 44
@@ -323,20 +876,258 @@ def merge_wavs(wav_paths, merged_path: Path) -> bool:
 # Whisper transcription
 # ---------------------------------------------------------------------------
 
-def transcribe_with_whisper_api(audio_path: Path) -> str:
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-    data = {"model": WHISPER_MODEL, "language": WHISPER_LANGUAGE}
-    with open(audio_path, "rb") as f:
-        files = {"file": (audio_path.name, f, "audio/wav")}
-        response = requests.post(
-            WHISPER_API_URL,
-            headers=headers,
-            data=data,
-            files=files,
-            timeout=300,
-        )
+class WavSlice:
+    """Read-only file-like view of part of a PCM WAV's data chunk behind a fresh
+    header, so a segment can be uploaded without writing it to disk first."""
+
+    def __init__(self, path: Path, fmt: bytes, offset: int, size: int, name: str):
+        self.name = name
+        self._path = path
+        self._head = _wav_header(fmt, size)
+        self._start = offset
+        self._end = offset + size
+        self._fd = -1
+
+    def __enter__(self):
+        self._fd = os.open(self._path, os.O_RDONLY)
+        self._head_pos = 0
+        self._pos = self._start
+        return self
+
+    def __exit__(self, *exc):
+        os.close(self._fd)
+        self._fd = -1
+
+    @property
+    def len(self) -> int:
+        """Bytes left to read; MultipartEncoder polls this instead of seeking."""
+        return len(self._head) - self._head_pos + self._end - self._pos
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0:
+            n = self.len
+        out = b""
+        if self._head_pos < len(self._head):
+            out = self._head[self._head_pos:self._head_pos + n]
+            self._head_pos += len(out)
+            n -= len(out)
+        if n > 0 and self._pos < self._end:
+            data = os.pread(self._fd, min(n, self._end - self._pos), self._pos)
+            self._pos += len(data)
+            out += data
+        return out
+
+
+_AUDIO_MIME_TYPES = {".wav": "audio/wav", ".flac": "audio/flac"}
+
+
+def transcribe_with_whisper_api(audio) -> str:
+    """Transcribes a WAV file (Path) or a WavSlice of one."""
+    # Plain-text responses skip building a JSON document just to read "text".
+    # MultipartEncoder streams the file from disk instead of assembling the
+    # whole multipart body (the entire WAV) in memory first. A consumed
+    # encoder cannot be rewound by urllib3, so 429/5xx are retried here.
+    for attempt in range(1, MAX_RETRIES + 1):
+        with (open(audio, "rb") if isinstance(audio, Path) else audio) as f:
+            body = MultipartEncoder(fields={
+                "model": WHISPER_MODEL,
+                "language": WHISPER_LANGUAGE,
+                "response_format": "text",
+                "file": (audio.name, f, _AUDIO_MIME_TYPES[Path(audio.name).suffix]),
+            })
+            headers = {
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": body.content_type,
+            }
+            response = _HTTP.post(
+                WHISPER_API_URL,
+                headers=headers,
+                data=body,
+                timeout=300,
+            )
+        if response.status_code not in WHISPER_RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = RETRY_DELAY_S * attempt
+        log.warning("Whisper API returned %s for %s, retrying in %.0fs...",
+                    response.status_code, audio.name, delay)
+        time.sleep(delay)
+
     response.raise_for_status()
-    return response.json().get("text", "").strip()
+    response.encoding = "utf-8"
+    return response.text.strip()
+
+
+def wav_segments(wav_path: Path) -> list:
+    """Splits wav_path into WHISPER_SEGMENT_S WavSlices; nothing is written to disk."""
+    try:
+        fmt, offset, size = _wav_layout(wav_path)
+    except ValueError as exc:
+        log.warning("Could not split %s, sending it whole: %s", wav_path.name, exc)
+        return [wav_path]
+
+    byte_rate, block_align = struct.unpack_from("<IH", fmt, 8)
+    step = WHISPER_SEGMENT_S * byte_rate // block_align * block_align
+    if size <= step:
+        return [wav_path]
+    return [
+        WavSlice(wav_path, fmt, offset + b, min(step, size - b), f"{wav_path.stem}_{n:03d}.wav")
+        for n, b in enumerate(range(0, size, step))
+    ]
+
+
+def _flac_segments(audio_path: Path, tmp: Path) -> list[Path] | None:
+    """Encodes audio_path into WHISPER_SEGMENT_S FLAC files in tmp, or None on failure."""
+    returncode, err = _run_ffmpeg([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(audio_path),
+        "-c:a", "flac", "-compression_level", "5",
+        "-f", "segment", "-segment_time", str(WHISPER_SEGMENT_S), "-reset_timestamps", "1",
+        str(tmp / f"{audio_path.stem}_%03d.flac"),
+    ])
+    if returncode != 0:
+        log.warning("Could not encode %s to FLAC: %s", audio_path.name, _decode_err(err))
+        return None
+    return sorted(tmp.glob(f"{audio_path.stem}_[0-9][0-9][0-9].flac"))
+
+
+def whisper_segments(audio_paths: list[Path], tmp: Path) -> list:
+    """Turns extracted chunks, in order, into uploads Whisper accepts.
+
+    Uploads are FLAC, about half the bytes of the PCM WAVs: cached FLAC
+    chunks under the upload cap go as they are, everything else is encoded
+    into WHISPER_SEGMENT_S pieces in tmp. If encoding fails, WAVs are sliced
+    in place instead.
+    """
+    segments = []
+    for path in audio_paths:
+        if path.suffix == ".flac" and path.stat().st_size <= WHISPER_MAX_UPLOAD_BYTES:
+            segments.append(path)
+            continue
+        flacs = _flac_segments(path, tmp)
+        if flacs:
+            segments.extend(flacs)
+        elif path.suffix == ".wav":
+            segments.extend(wav_segments(path))
+        else:
+            raise RuntimeError(f"ffmpeg could not split {path.name} for upload")
+    return segments
+
+
+def _prewarm_whisper() -> None:
+    try:
+        _HTTP.head(WHISPER_API_URL, timeout=10).close()
+    except requests.RequestException as exc:
+        log.debug("Whisper prewarm failed: %s", exc)
+
+
+_local_model = None
+_local_model_lock = threading.Lock()
+
+
+def _load_local_model():
+    """Loads the faster-whisper model once per process, int8 so it runs well on CPU.
+
+    Returns a batched pipeline: it cuts each file into speech segments with
+    VAD and decodes LOCAL_WHISPER_BATCH_SIZE of them per model call.
+    """
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            try:
+                from faster_whisper import BatchedInferencePipeline, WhisperModel
+            except ImportError as exc:
+                raise RuntimeError("whisper_backend 'local' needs faster-whisper >= 1.1") from exc
+            log.info("Loading faster-whisper model '%s' (int8)...", LOCAL_WHISPER_MODEL)
+            _local_model = BatchedInferencePipeline(model=WhisperModel(
+                LOCAL_WHISPER_MODEL,
+                device="auto",
+                compute_type="int8",
+                download_root=LOCAL_WHISPER_MODEL_DIR,
+            ))
+    return _local_model
+
+
+def transcribe_with_faster_whisper(audio) -> str:
+    """Transcribes a file (Path) or a WavSlice of one on this machine."""
+    model = _load_local_model()
+    with (open(audio, "rb") if isinstance(audio, Path) else audio) as f:
+        segments, _ = model.transcribe(f, language=WHISPER_LANGUAGE, batch_size=LOCAL_WHISPER_BATCH_SIZE)
+        return " ".join(s.text.strip() for s in segments).strip()
+
+
+def _gevent_threads() -> bool:
+    """Whether threading is gevent-patched, as it is under the web UI."""
+    if "gevent" not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched("threading")
+
+
+def _native_pool(workers: int) -> ThreadPoolExecutor:
+    """A pool of real OS threads for CPU-bound work.
+
+    The web UI runs under gevent, where a plain ThreadPoolExecutor hands out
+    greenlets and a long model call would freeze every request until it ends.
+    """
+    if _gevent_threads():
+        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+        return GeventThreadPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper")
+
+
+def _off_hub(fn, *args):
+    """fn(*args), on a real OS thread under gevent so long blocking file I/O
+    does not freeze the web UI. Not for anything that starts a subprocess:
+    gevent only runs those from the main thread's loop.
+    """
+    if _gevent_threads():
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+class ChunkTranscriber:
+    """Starts transcribing each chunk as soon as it is extracted.
+
+    Chunks may arrive in any order; text() joins them by index. Pending
+    work is cancelled by close() if the run fails first.
+    """
+
+    def __init__(self, tmp: Path):
+        self._tmp = tmp
+        self._local = WHISPER_BACKEND == "local"
+        # The local model already spreads one transcription over every core.
+        workers = 1 if self._local else WHISPER_WORKERS
+        self._pool = _native_pool(workers) if self._local else ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="whisper")
+        self._futures: dict[int, list] = {}
+        # Model load, or DNS and the TLS handshake, happen while the first
+        # chunk downloads instead of in front of the first transcription.
+        self._pool.submit(_load_local_model if self._local else _prewarm_whisper)
+
+    @property
+    def segment_count(self) -> int:
+        return sum(len(f) for f in self._futures.values())
+
+    def add(self, index: int, audio_path: Path) -> None:
+        if self._local:
+            # No upload cap to split for.
+            self._futures[index] = [self._pool.submit(transcribe_with_faster_whisper, audio_path)]
+            return
+        self._futures[index] = [
+            self._pool.submit(transcribe_with_whisper_api, segment)
+            for segment in whisper_segments([audio_path], self._tmp)
+        ]
+
+    def text(self) -> str:
+        texts = [f.result() for i in sorted(self._futures) for f in self._futures[i]]
+        return "\n".join(t for t in texts if t)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
 
 
 # ---------------------------------------------------------------------------
@@ -353,7 +1144,7 @@ def send_home_assistant_notification(message: str, title: str) -> None:
         "Content-Type": "application/json",
     }
     payload = {"title": title, "message": message}
-    response = requests.post(
+    response = _HTTP.post(
         HA_NOTIFY_ENDPOINT,
         headers=headers,
         json=payload,
@@ -368,75 +1159,91 @@ def send_home_assistant_notification(message: str, title: str) -> None:
 
 def cleanup_files(paths) -> None:
     for p in paths:
+        if not p:
+            continue
         try:
-            if p and p.exists():
-                os.remove(p)
-        except Exception as exc:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
             log.warning("Could not remove %s: %s", p, exc)
 
 
-def persist_audio_file(src: Path) -> Path:
+def _pick_tmp_root() -> str | None:
+    """Prefers tmpfs for the work dir when it has room for a fallback MP4 or two.
+
+    Docker's default /dev/shm is only 64 MB, so most hosts keep using the
+    system temp dir; hosts with a larger shm skip the SD card/eMMC entirely.
+    """
+    try:
+        if shutil.disk_usage(TMPFS_ROOT).free > TMPFS_MIN_FREE_BYTES:
+            return TMPFS_ROOT
+    except OSError:
+        pass
+    return None
+
+
+def export_audio_path() -> Path:
     EXPORT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
     ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    dst = EXPORT_AUDIO_DIR / f"unifi_protect_{CAMERA_ID}_{ts}.wav"
-    shutil.copy2(src, dst)
-    return dst
+    return EXPORT_AUDIO_DIR / f"unifi_protect_{CAMERA_ID}_{ts}.wav"
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def collect_wavs_from_download(tmp: Path, session: requests.Session) -> list[Path]:
-    token = authenticate_unifi(session)
-    chunk_ranges = build_hour_chunks(HOURS_BACK)
-    wav_paths: list[Path] = []
-
-    for i, (chunk_start, chunk_end) in enumerate(chunk_ranges, start=1):
-        mp4_path = tmp / f"chunk_{i:03d}.mp4"
-        wav_path = tmp / f"chunk_{i:03d}.wav"
-
-        try:
-            downloaded = download_chunk_mp4(
-                session, token, chunk_start, chunk_end, mp4_path
-            )
-        except AuthError:
-            send_home_assistant_notification(
-                message="Autoryzacja UniFi Protect nie powiodla sie (401/403). Sprawdz dane logowania.",
-                title="UniFi Protect Error",
+def _download_and_extract(token: str, start_ms: int, end_ms: int,
+                          mp4_path: Path, wav_path: Path) -> bool:
+    try:
+        extracted = fetch_chunk_wav(_unifi_session(), token, start_ms, end_ms, mp4_path, wav_path)
+    except ExportRejected:
+        extracted = None
+    if not extracted:
+        cleanup_files([wav_path])
+    return bool(extracted)
+
+
+def collect_wavs_from_download(tmp: Path, session: requests.Session | None = None) -> list[Path]:
+    token = authenticate_unifi(session or _unifi_session())
+    chunk_ranges = build_hour_chunks(HOURS_BACK, export_span_hours())
+    found: dict[int, Path] = {}
+
+    pool = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk")
+    try:
+        futures = {}
+        for i, (start_ms, end_ms) in enumerate(chunk_ranges, start=1):
+            wav_path = tmp / f"chunk_{i:03d}.wav"
+            fut = pool.submit(
+                _download_and_extract, token, start_ms, end_ms,
+                tmp / f"chunk_{i:03d}.mp4", wav_path,
             )
-            raise
-
-        if not downloaded:
-            cleanup_files([mp4_path, wav_path])
-            continue
-
-        extracted = extract_wav_with_silence_removal(mp4_path, wav_path)
-        cleanup_files([mp4_path])
-
-        if extracted:
-            wav_paths.append(wav_path)
-        else:
-            cleanup_files([wav_path])
+            futures[fut] = (i, wav_path)
+
+        for fut in as_completed(futures):
+            i, wav_path = futures[fut]
+            try:
+                extracted = fut.result()
+            except AuthError:
+                send_home_assistant_notification(
+                    message="Autoryzacja UniFi Protect nie powiodla sie (401/403). Sprawdz dane logowania.",
+                    title="UniFi Protect Error",
+                )
+                raise
+            if extracted:
+                found[i] = wav_path
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
-    return wav_paths
+    return [found[i] for i in sorted(found)]
 
 
 def collect_wavs_from_local(tmp: Path) -> list[Path]:
     input_dir = Path(LOCAL_INPUT_DIR)
-    mp4_files = sorted(input_dir.glob("*.mp4"))
+    mp4_files = sorted(iter_mp4s(input_dir))
     log.info("Local mode: found %d MP4 file(s) in %s", len(mp4_files), input_dir)
 
-    wav_paths: list[Path] = []
-    for i, mp4_path in enumerate(mp4_files, start=1):
-        wav_path = tmp / f"local_{i:03d}.wav"
-        extracted = extract_wav_with_silence_removal(mp4_path, wav_path)
-        if extracted:
-            wav_paths.append(wav_path)
-        else:
-            cleanup_files([wav_path])
-
-    return wav_paths
+    return [wav for _, _, wavs in extract_local_files(mp4_files, tmp) for wav in wavs]
 
 
 def run_pipeline(
@@ -449,14 +1256,20 @@ def run_pipeline(
 ) -> dict:
     """Run the full pipeline. Returns dict with keys: ok, message, audio_file, transcription."""
 
+    # Chunk workers report from their own threads; callers get one event at
+    # a time in a consistent order without having to lock themselves.
+    callback_lock = threading.Lock()
+
     def _status(msg: str):
         log.info(msg)
         if status_callback:
-            status_callback(msg)
+            with callback_lock:
+                status_callback(msg)
 
     def _chunk(event: str, **kwargs):
         if chunks_callback:
-            chunks_callback(event, **kwargs)
+            with callback_lock:
+                chunks_callback(event, **kwargs)
 
     result = {"ok": False, "message": "", "audio_file": None, "transcription": None}
 
@@ -465,86 +1278,158 @@ def run_pipeline(
     effective_local = local_dir if local_dir else (LOCAL_INPUT_DIR if mode == "auto" else "")
 
     wav_paths: list[Path] = []
-    merged_wav = None
     chunk_cache_dir = None
+    transcriber = None
 
-    with tempfile.TemporaryDirectory(prefix="unifi_hist_") as temp_dir:
+    with tempfile.TemporaryDirectory(prefix="unifi_hist_", dir=_pick_tmp_root()) as temp_dir:
         tmp = Path(temp_dir)
 
         try:
+            if effective_transcribe:
+                transcriber = ChunkTranscriber(tmp)
+
             if effective_local:
                 _status(f"LOCAL mode: processing MP4 files from {effective_local}")
                 input_dir = Path(effective_local)
-                mp4_files = sorted(input_dir.glob("*.mp4"))
+                mp4_files = sorted(iter_mp4s(input_dir))
                 _status(f"Found {len(mp4_files)} MP4 file(s)")
                 _chunk("total", n=len(mp4_files))
-                for i, mp4_path in enumerate(mp4_files, start=1):
-                    wav_path = tmp / f"local_{i:03d}.wav"
-                    label = f"{i}/{len(mp4_files)}: {mp4_path.name}"
-                    _status(f"Extracting audio from {mp4_path.name} ({i}/{len(mp4_files)})")
-                    _chunk("extracting", label=label)
-                    if extract_wav_with_silence_removal(mp4_path, wav_path):
-                        wav_paths.append(wav_path)
-                        _chunk("downloaded", label=label)
-                    else:
-                        cleanup_files([wav_path])
-                        _chunk("failed", label=label)
+                def _on_batch(first: int, last: int):
+                    _status(f"Extracting audio from {last - first + 1} file(s) ({first}-{last}/{len(mp4_files)})")
+                    _chunk("extracting", label=f"{first}-{last}/{len(mp4_files)}")
+
+                for idx, extracted, wavs in extract_local_files(mp4_files, tmp, _on_batch):
+                    for k, ok in zip(idx, extracted):
+                        label = f"{k + 1}/{len(mp4_files)}: {mp4_files[k].name}"
+                        _chunk("downloaded" if ok else "failed", label=label)
+                    for wav in wavs:
+                        if transcriber:
+                            transcriber.add(len(wav_paths), wav)
+                        wav_paths.append(wav)
                 _chunk("done")
             else:
                 _status("DOWNLOAD mode: fetching from UniFi Protect")
-                session = requests.Session()
+                session = _unifi_session()
                 token = authenticate_unifi(session)
-                end_ts = datetime.now(timezone.utc)
-                start_ts = end_ts - timedelta(hours=effective_hours)
-                chunks = []
-                cursor = start_ts
-                while cursor < end_ts:
-                    chunk_end = min(cursor + CHUNK_DURATION, end_ts)
-                    chunks.append((cursor, chunk_end))
-                    cursor = chunk_end
+                span = export_span_hours()
+                chunks = list(build_hour_chunks(effective_hours, span))
+                last_end_ms = chunks[-1][1] if chunks else 0
+                total = len(chunks)
+                # Longest span exported successfully this run; a later
+                # rejection of a shorter tail chunk must not cap below it.
+                accepted_hours = 0
 
                 chunk_cache_dir = EXPORT_AUDIO_DIR / "chunk_cache"
                 chunk_cache_dir.mkdir(parents=True, exist_ok=True)
-                _chunk("total", n=len(chunks))
+                _chunk("total", n=total)
 
-                skipped = 0
-                for i, (cs, ce) in enumerate(chunks, start=1):
-                    start_ms = int(cs.timestamp() * 1000)
-                    end_ms = int(ce.timestamp() * 1000)
-                    cached_wav = chunk_cache_dir / f"{CAMERA_ID}_{start_ms}_{end_ms}.wav"
-                    label = f"{i}/{len(chunks)}: {cs.strftime('%H:%M')}-{ce.strftime('%H:%M')}"
-
-                    if cached_wav.exists() and cached_wav.stat().st_size > 0:
-                        _status(f"Chunk {label} already cached, skipping")
-                        wav_paths.append(cached_wav)
-                        skipped += 1
-                        _chunk("skipped", label=label)
-                        continue
-
-                    mp4_path = tmp / f"chunk_{i:03d}.mp4"
+                def _fetch(i: int, start_ms: int, end_ms: int, label: str, cached_wav: Path):
+                    """The chunk's cached WAV, or None; re-raises a rejection the caller can split."""
+                    nonlocal accepted_hours
+                    session = _unifi_session()
+                    mp4_path = tmp / f"chunk_{start_ms}.mp4"
                     _status(f"Downloading chunk {label}")
                     _chunk("downloading", label=label)
-                    downloaded = download_chunk_mp4(session, token, cs, ce, mp4_path)
-                    if not downloaded:
-                        cleanup_files([mp4_path])
+                    # ffmpeg writes straight into the cache; the rename only
+                    # publishes chunks that were fully extracted.
+                    wav_part = cached_wav.with_name(cached_wav.stem + ".part.flac")
+
+                    downloaded_at = None
+
+                    def _on_extract():
+                        nonlocal downloaded_at
+                        downloaded_at = time.monotonic()
+                        _status(f"Extracting audio from chunk {i}/{len(chunks)}")
+                        _chunk("extracting", label=label)
+
+                    try:
+                        extracted = fetch_chunk_wav(session, token, start_ms, end_ms, mp4_path, wav_part, _on_extract)
+                    except ExportRejected as exc:
+                        cleanup_files([wav_part])
+                        if exc.span_too_long and span_hours(start_ms, end_ms) > 1:
+                            raise
+                        extracted = None
+                    if extracted is None:
+                        cleanup_files([wav_part])
                         _chunk("failed", label=label)
-                        continue
-                    _status(f"Extracting audio from chunk {i}/{len(chunks)}")
-                    _chunk("extracting", label=label)
-                    wav_tmp = tmp / f"chunk_{i:03d}.wav"
-                    if extract_wav_with_silence_removal(mp4_path, wav_tmp):
-                        shutil.copy2(wav_tmp, cached_wav)
-                        wav_paths.append(cached_wav)
-                        cleanup_files([wav_tmp])
+                        return None
+                    kept = None
+                    if extracted:
+                        os.replace(wav_part, cached_wav)
+                        kept = cached_wav
                     else:
-                        cleanup_files([wav_tmp])
-                    cleanup_files([mp4_path])
+                        cleanup_files([wav_part])
+                    accepted_hours = max(accepted_hours, span_hours(start_ms, end_ms))
                     _chunk("downloaded", label=label)
 
-                    if i < len(chunks):
-                        _status(f"Cooldown {CHUNK_COOLDOWN_S}s (letting UDM breathe)...")
-                        time.sleep(CHUNK_COOLDOWN_S)
-
+                    # The cooldown only spaces out requests to the UDM, so
+                    # time spent extracting a downloaded MP4 counts towards it.
+                    if end_ms < last_end_ms:
+                        remaining = CHUNK_COOLDOWN_S
+                        if downloaded_at is not None:
+                            remaining -= time.monotonic() - downloaded_at
+                        if remaining > 0:
+                            _status(f"Cooldown {remaining:.0f}s (letting UDM breathe)...")
+                            time.sleep(remaining)
+                    return kept
+
+                # Keyed by start_ms, so chunks re-split after a rejection
+                # still sort into place.
+                found: dict[int, Path] = {}
+                skipped = 0
+                pool = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk")
+                try:
+                    futures = {}
+
+                    def _submit(i: int, start_ms: int, end_ms: int):
+                        cached_wav = chunk_cache_dir / _chunk_cache_name(start_ms, end_ms)
+                        label = f"{i}/{len(chunks)}: {_utc(start_ms):%H:%M}-{_utc(end_ms):%H:%M}"
+                        futures[pool.submit(_fetch, i, start_ms, end_ms, label, cached_wav)] = (i, start_ms, end_ms)
+
+                    for i, (start_ms, end_ms) in enumerate(chunks, start=1):
+                        cached_wav = chunk_cache_dir / _chunk_cache_name(start_ms, end_ms)
+                        label = f"{i}/{len(chunks)}: {_utc(start_ms):%H:%M}-{_utc(end_ms):%H:%M}"
+
+                        if cached_wav.exists() and cached_wav.stat().st_size > 0:
+                            _status(f"Chunk {label} already cached, skipping")
+                            found[start_ms] = cached_wav
+                            if transcriber:
+                                transcriber.add(start_ms, cached_wav)
+                            skipped += 1
+                            _chunk("skipped", label=label)
+                            continue
+
+                        _submit(i, start_ms, end_ms)
+
+                    while futures:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            i, start_ms, end_ms = futures.pop(fut)
+                            try:
+                                wav = fut.result()
+                            except ExportRejected as exc:
+                                # Retry the range as shorter spans in this run,
+                                # and cap later runs below the refused span.
+                                hours = span_hours(start_ms, end_ms)
+                                reject_export_span(hours, accepted_hours)
+                                pieces = split_export_span(start_ms, end_ms)
+                                _status(
+                                    f"UniFi rejected a {hours}h export (HTTP {exc.status}), "
+                                    f"retrying as {len(pieces)} shorter chunk(s)"
+                                )
+                                total += len(pieces) - 1
+                                _chunk("total", n=total)
+                                for piece_start, piece_end in pieces:
+                                    _submit(i, piece_start, piece_end)
+                                continue
+                            if wav is not None:
+                                found[start_ms] = wav
+                                if transcriber:
+                                    transcriber.add(start_ms, wav)
+                finally:
+                    pool.shutdown(wait=True, cancel_futures=True)
+
+                wav_paths.extend(found[i] for i in sorted(found))
                 _chunk("done")
                 if skipped:
                     _status(f"Skipped {skipped} already-cached chunk(s)")
@@ -555,18 +1440,45 @@ def run_pipeline(
                 return result
 
             _status("Merging audio chunks...")
-            merged_wav = tmp / "merged.wav"
-            if not merge_wavs(wav_paths, merged_wav):
+            # The merge writes straight into the export dir, so the result is
+            # never copied out of the work dir; the rename publishes it whole
+            # and the web UI, which lists *.wav, never sees a partial file.
+            audio_file = export_audio_path()
+            merged_wav = audio_file.with_name(audio_file.name + ".part")
+            text = None
+            text_error = None
+            merged = False
+            try:
+                # The merged file is only what gets saved; Whisper is fed the
+                # chunks themselves, so uploads start while the merge runs.
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix="merge") as merge_pool:
+                    merging = merge_pool.submit(merge_wavs, wav_paths, merged_wav, tmp)
+                    if transcriber:
+                        backend = "faster-whisper" if WHISPER_BACKEND == "local" else "Whisper API"
+                        _status(f"Transcribing with {backend} ({transcriber.segment_count} segment(s))...")
+                        try:
+                            text = transcriber.text()
+                        except Exception as exc:
+                            # Re-raised once the audio is saved: a Whisper
+                            # failure must not discard the merged recording.
+                            text_error = exc
+                    merged = merging.result()
+            finally:
+                if merged:
+                    os.replace(merged_wav, audio_file)
+                else:
+                    cleanup_files([merged_wav])
+
+            if not merged:
                 result["message"] = "Nie udalo sie polaczyc plikow audio."
                 return result
 
-            audio_file = persist_audio_file(merged_wav)
             result["audio_file"] = str(audio_file)
             _status(f"Audio saved: {audio_file}")
+            if text_error is not None:
+                raise text_error
 
             if effective_transcribe:
-                _status("Transcribing with Whisper API...")
-                text = transcribe_with_whisper_api(merged_wav)
                 if not text:
                     text = "(Brak tresci po transkrypcji)"
                 result["transcription"] = text
@@ -597,7 +1509,8 @@ def run_pipeline(
             return result
 
         finally:
-            cleanup_files([merged_wav] if merged_wav else [])
+            if transcriber:
+                transcriber.close()
 
 
 def main() -> int:
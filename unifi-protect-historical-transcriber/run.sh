@@ -15,23 +15,30 @@ export UNIFI_PASSWORD="$(jq -r '.unifi_password // ""' "$CONFIG")"
 export CAMERA_ID="$(jq -r '.camera_id // ""' "$CONFIG")"
 export HOURS_BACK="$(jq -r '.hours_back // 6' "$CONFIG")"
 export WHISPER_ENABLED="$(jq -r '.whisper_enabled // true' "$CONFIG")"
+export WHISPER_BACKEND="$(jq -r '.whisper_backend // "api"' "$CONFIG")"
 export WHISPER_API_URL="$(jq -r '.whisper_api_url // "https://api.openai.com/v1/audio/transcriptions"' "$CONFIG")"
 export OPENAI_API_KEY="$(jq -r '.openai_api_key // ""' "$CONFIG")"
 export WHISPER_MODEL="$(jq -r '.whisper_model // "whisper-1"' "$CONFIG")"
 export WHISPER_LANGUAGE="$(jq -r '.whisper_language // "pl"' "$CONFIG")"
+export LOCAL_WHISPER_MODEL="$(jq -r '.local_whisper_model // "small"' "$CONFIG")"
 export EXPORT_AUDIO_DIR="$(jq -r '.export_audio_dir // "/share/unifi_protect_audio"' "$CONFIG")"
 export KEEP_AUDIO_FILES="$(jq -r '.keep_audio_files // true' "$CONFIG")"
 export SILENCE_THRESHOLD_DB="$(jq -r '.silence_threshold_db // "-40dB"' "$CONFIG")"
 export START_SILENCE_DURATION="$(jq -r '.start_silence_duration // 0.2' "$CONFIG")"
 export STOP_SILENCE_DURATION="$(jq -r '.stop_silence_duration // 0.5' "$CONFIG")"
 export CHUNK_COOLDOWN="$(jq -r '.chunk_cooldown // 5' "$CONFIG")"
+export CHUNK_WORKERS="$(jq -r '.chunk_workers // 2' "$CONFIG")"
+export EXPORT_CHUNK_HOURS="$(jq -r '.export_chunk_hours // 1' "$CONFIG")"
+export STREAM_CHUNKS="$(jq -r 'if .stream_chunks == false then "false" else "true" end' "$CONFIG")"
+export WHISPER_WORKERS="$(jq -r '.whisper_workers // 4' "$CONFIG")"
 export VERIFY_TLS="$(jq -r '.verify_tls // false' "$CONFIG")"
 
 echo "[INFO] Starting UniFi Protect Historical Transcriber (Web UI)"
 echo "[INFO]   UniFi URL      : ${UNIFI_BASE_URL}"
 echo "[INFO]   Camera ID      : ${CAMERA_ID}"
 echo "[INFO]   Hours back     : ${HOURS_BACK}"
-echo "[INFO]   Whisper        : ${WHISPER_ENABLED}"
+echo "[INFO]   Chunk workers  : ${CHUNK_WORKERS}"
+echo "[INFO]   Whisper        : ${WHISPER_ENABLED} (${WHISPER_BACKEND})"
 echo "[INFO]   Export dir     : ${EXPORT_AUDIO_DIR}"
 
 exec python /web.py
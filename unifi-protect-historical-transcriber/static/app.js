@@ -0,0 +1,331 @@
+const BASE = window.location.pathname.replace(/\/+$/, '');
+
+function switchTab(name) {
+  document.querySelectorAll('.tab').forEach(x => x.classList.remove('active'));
+  document.querySelectorAll('.panel').forEach(x => x.classList.remove('active'));
+  const tab = document.querySelector(`.tab[data-tab="${name}"]`);
+  if (tab) tab.classList.add('active');
+  document.getElementById(name).classList.add('active');
+}
+
+document.querySelectorAll('.tab').forEach(t => {
+  t.addEventListener('click', () => switchTab(t.dataset.tab));
+});
+
+document.getElementById('mode').addEventListener('change', e => {
+  document.getElementById('local-dir-row').style.display = e.target.value === 'local' ? 'block' : 'none';
+});
+
+function escapeHtml(s) {
+  return String(s).replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+}
+
+const fileRow = document.getElementById('file-row').content.firstElementChild;
+
+async function loadFiles() {
+  try {
+    const r = await fetch(BASE + '/api/files');
+    renderFiles((await r.json()).files);
+  } catch(e) { console.error('loadFiles', e); }
+}
+
+function renderFiles(files) {
+  const ul = document.getElementById('file-list');
+  if (!files.length) { ul.innerHTML = '<li class="empty">Brak plikow audio</li>'; return; }
+  const frag = document.createDocumentFragment();
+  for (const f of files) {
+    const li = fileRow.cloneNode(true);
+    li.dataset.name = f.name;
+    li.querySelector('.file-name').textContent = f.name;
+    li.querySelector('.file-meta').textContent = `${f.size_mb} MB \u00b7 ${f.modified}`;
+    li.querySelector('a').href = BASE + '/api/download/' + encodeURIComponent(f.name);
+    frag.append(li);
+  }
+  ul.replaceChildren(frag);
+}
+
+async function deleteFile(name) {
+  if (!confirm('Usunac ' + name + '?')) return;
+  await fetch(BASE + '/api/files/' + encodeURIComponent(name), {method:'DELETE'});
+  loadFiles();
+}
+
+// One listener for every row; the row's data-name says which file.
+document.getElementById('file-list').addEventListener('click', e => {
+  const li = e.target.closest('li[data-name]');
+  if (li && e.target.closest('.btn-del')) deleteFile(li.dataset.name);
+});
+
+// Texts already fetched this session, keyed on name/size/mtime, oldest first.
+const transcriptTexts = new Map();
+const TRANSCRIPT_CACHE_MAX = 20;
+
+async function loadTranscripts() {
+  try {
+    const r = await fetch(BASE + '/api/transcripts');
+    renderTranscripts((await r.json()).transcripts);
+  } catch(e) { console.error('loadTranscripts', e); }
+}
+
+function renderTranscripts(transcripts) {
+  const div = document.getElementById('transcript-list');
+  if (!transcripts.length) { div.innerHTML = '<div class="empty">Brak transkrypcji</div>'; return; }
+  div.innerHTML = transcripts.map(t => `<details class="card" style="margin-bottom:12px"
+      data-name="${escapeHtml(t.name)}" data-key="${escapeHtml(`${t.name}|${t.size}|${t.modified}`)}">
+    <summary style="display:flex;justify-content:space-between;cursor:pointer">
+      <strong>${escapeHtml(t.name)}</strong>
+      <span class="file-meta">${(t.size / 1024).toFixed(1)} KB &middot; ${t.modified}</span>
+    </summary>
+    <div class="transcript-box">Ladowanie...</div>
+  </details>`).join('');
+  div.querySelectorAll('details').forEach(d => {
+    d.addEventListener('toggle', () => { if (d.open) showTranscript(d); });
+  });
+}
+
+async function showTranscript(el) {
+  const key = el.dataset.key;
+  try {
+    let text = transcriptTexts.get(key);
+    if (text === undefined) {
+      const r = await fetch(BASE + '/api/transcripts/' + encodeURIComponent(el.dataset.name));
+      text = (await r.text()).trim();
+    }
+    transcriptTexts.delete(key);
+    transcriptTexts.set(key, text);
+    if (transcriptTexts.size > TRANSCRIPT_CACHE_MAX) {
+      transcriptTexts.delete(transcriptTexts.keys().next().value);
+    }
+    el.querySelector('.transcript-box').textContent = text;
+  } catch(e) { console.error('showTranscript', e); }
+}
+
+let pollTimer = null;
+let events = null;
+let jobActive = false;
+let statusLines = [];
+let statusCursor = '';
+let filesEtag = '';
+let transcriptsEtag = '';
+// The server keeps the same number of log lines.
+const STATUS_MAX_LINES = 500;
+
+function mergeStatus(data) {
+  const lines = data.status_from ? statusLines.concat(data.status) : data.status;
+  statusLines = lines.slice(-STATUS_MAX_LINES);
+  statusCursor = data.cursor;
+  return {...data, status: statusLines, appended: data.status_from ? data.status : null};
+}
+
+// Listings and job state in one request. A listing we already have (same
+// ETag) comes back as null and is left alone.
+async function fetchState() {
+  const q = new URLSearchParams({files: filesEtag, transcripts: transcriptsEtag, since: statusCursor});
+  const r = await fetch(BASE + '/api/state?' + q);
+  const data = await r.json();
+  if (data.files) { filesEtag = data.etags.files; renderFiles(data.files); }
+  if (data.transcripts) { transcriptsEtag = data.etags.transcripts; renderTranscripts(data.transcripts); }
+  return mergeStatus(data.job);
+}
+
+function setRunningUI(running, lastStep) {
+  const banner = document.getElementById('activity-banner');
+  const dot = document.getElementById('process-dot');
+  const btnStart = document.getElementById('btn-start');
+
+  jobActive = running;
+  if (running) {
+    banner.classList.add('visible');
+    dot.classList.add('visible');
+    btnStart.disabled = true;
+    document.getElementById('job-card').style.display = 'block';
+    document.getElementById('job-badge').textContent = 'W trakcie...';
+    document.getElementById('job-badge').className = 'badge badge-running';
+    if (lastStep) document.getElementById('banner-step').textContent = lastStep;
+  } else {
+    banner.classList.remove('visible');
+    dot.classList.remove('visible');
+    btnStart.disabled = false;
+  }
+}
+
+function parseProgress(statusLines) {
+  for (let i = statusLines.length - 1; i >= 0; i--) {
+    const m = statusLines[i].match(/chunk (\d+)\/(\d+)/i);
+    if (m) return { current: parseInt(m[1]), total: parseInt(m[2]) };
+    const mLocal = statusLines[i].match(/\((\d+)\/(\d+)\)/);
+    if (mLocal) return { current: parseInt(mLocal[1]), total: parseInt(mLocal[2]) };
+  }
+  return null;
+}
+
+function formatElapsed(isoStart) {
+  if (!isoStart) return '';
+  const start = new Date(isoStart);
+  const diff = Math.floor((Date.now() - start.getTime()) / 1000);
+  if (diff < 0) return '';
+  const m = Math.floor(diff / 60);
+  const s = diff % 60;
+  return m > 0 ? `${m}m ${s}s` : `${s}s`;
+}
+
+async function startJob() {
+  const mode = document.getElementById('mode').value;
+  const hours = document.getElementById('hours').value;
+  const localDir = document.getElementById('local-dir').value;
+  const doTranscribe = document.getElementById('do-transcribe').checked;
+
+  setRunningUI(true, 'Uruchamianie...');
+  document.getElementById('job-log').textContent = '';
+  document.getElementById('progress-wrap').classList.remove('visible');
+  document.getElementById('progress-bar').style.width = '0%';
+
+  await fetch(BASE + '/api/start', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({mode, hours: parseInt(hours), local_dir: localDir, do_transcribe: doTranscribe})
+  });
+
+  startPolling();
+}
+
+function stopUpdates() {
+  if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+  if (events) { events.close(); events = null; }
+}
+
+function startPolling() {
+  stopUpdates();
+  if (typeof EventSource === 'undefined') {
+    pollTimer = setInterval(pollStatus, 2000);
+    pollStatus();
+    return;
+  }
+  events = new EventSource(BASE + '/api/events');
+  events.onmessage = e => renderStatus(mergeStatus(JSON.parse(e.data)));
+  // Fall back to polling if the stream cannot be kept open (e.g. a proxy buffers it).
+  events.onerror = () => {
+    stopUpdates();
+    pollTimer = setInterval(pollStatus, 2000);
+    pollStatus();
+  };
+}
+
+async function pollStatus() {
+  try {
+    renderStatus(await fetchState());
+  } catch(e) { console.error('pollStatus', e); }
+}
+
+// One text node per line, so a delta only appends its new lines and the
+// trim drops the oldest nodes instead of rebuilding the whole log.
+function renderLog(logEl, data) {
+  if (data.appended) {
+    logEl.append(...data.appended.map(l => l + '\n'));
+    while (logEl.childNodes.length > STATUS_MAX_LINES) logEl.firstChild.remove();
+  } else {
+    logEl.replaceChildren(...data.status.map(l => l + '\n'));
+  }
+}
+
+function renderStatus(data) {
+  const logEl = document.getElementById('job-log');
+  const progressWrap = document.getElementById('progress-wrap');
+  const progressBar = document.getElementById('progress-bar');
+  const elapsed = document.getElementById('job-elapsed');
+
+  renderLog(logEl, data);
+  logEl.scrollTop = logEl.scrollHeight;
+
+  const lastLine = data.status.length ? data.status[data.status.length - 1] : '';
+  document.getElementById('banner-step').textContent =
+    lastLine.replace(/^\[\d{2}:\d{2}:\d{2}\]\s*/, '');
+
+  const ch = data.chunks || {};
+  const statsEl = document.getElementById('chunk-stats');
+  if (ch.total > 0) {
+    statsEl.style.display = 'flex';
+    document.getElementById('cs-total').textContent = ch.total;
+    document.getElementById('cs-done').textContent = ch.downloaded;
+    document.getElementById('cs-skip').textContent = ch.skipped;
+    document.getElementById('cs-fail').textContent = ch.failed;
+
+    const cwrap = document.getElementById('cs-current-wrap');
+    if (ch.current) {
+      cwrap.style.display = 'flex';
+      document.getElementById('cs-current').textContent = ch.current;
+    } else {
+      cwrap.style.display = 'none';
+    }
+
+    const processed = ch.downloaded + ch.skipped + ch.failed;
+    progressWrap.classList.add('visible');
+    progressBar.style.width = Math.round((processed / ch.total) * 100) + '%';
+  } else {
+    const prog = parseProgress(data.status);
+    if (prog && prog.total > 0) {
+      progressWrap.classList.add('visible');
+      progressBar.style.width = Math.round((prog.current / prog.total) * 100) + '%';
+    }
+  }
+
+  if (data.running) {
+    setRunningUI(true, lastLine);
+    elapsed.textContent = formatElapsed(data.started_at);
+  } else {
+    const finished = jobActive;
+    stopUpdates();
+    setRunningUI(false);
+    progressWrap.classList.remove('visible');
+    elapsed.textContent = '';
+    statsEl.style.display = 'none';
+
+    const badge = document.getElementById('job-badge');
+    if (data.result && data.result.ok) {
+      badge.textContent = 'Zakonczone';
+      badge.className = 'badge badge-done';
+      if (data.result.transcription) {
+        logEl.append('\n--- TRANSKRYPCJA ---\n' + data.result.transcription);
+      }
+    } else if (data.result) {
+      badge.textContent = 'Blad';
+      badge.className = 'badge badge-error';
+    } else {
+      document.getElementById('job-card').style.display = 'none';
+    }
+    logEl.scrollTop = logEl.scrollHeight;
+    // A job that just ended has written files; a finished one found on
+    // page load came with its listings already.
+    if (finished) {
+      loadFiles();
+      loadTranscripts();
+    }
+  }
+}
+
+async function loadConfig() {
+  try {
+    const r = await fetch(BASE + '/api/config');
+    const cfg = await r.json();
+    document.getElementById('hours').value = cfg.hours_back;
+    document.getElementById('local-dir').value = cfg.export_dir;
+    document.getElementById('do-transcribe').checked = cfg.whisper_enabled;
+  } catch(e) { console.error('loadConfig', e); }
+}
+
+async function initPage() {
+  loadConfig();
+  try {
+    const data = await fetchState();
+    if (data.running) {
+      switchTab('process');
+      setRunningUI(true, '');
+      startPolling();
+    } else if (data.result) {
+      document.getElementById('job-card').style.display = 'block';
+      renderStatus(data);
+    }
+  } catch(e) { console.error('initPage', e); }
+}
+
+initPage();
@@ -1,564 +1,526 @@
+# gevent has to patch the stdlib before threading/socket are imported anywhere.
+from gevent import monkey
+
+monkey.patch_all()
+
+import gzip
+import hashlib
+import json
 import os
+import stat
 import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template_string, request, send_file
+from flask import Flask, Response, request, send_file
+from werkzeug.wsgi import FileWrapper
 
 from main import EXPORT_AUDIO_DIR, HOURS_BACK, WHISPER_ENABLED, run_pipeline
 
-app = Flask(__name__)
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+# static/ is served by static_asset() below, from bodies compressed at import.
+app = Flask(__name__, static_folder=None)
+
+# Created once here; the listing endpoints assume it exists.
+EXPORT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+# Request handlers work on this resolved str path; os.path on strs skips the
+# Path object churn of EXPORT_AUDIO_DIR / name on every call.
+_EXPORT_DIR = os.path.realpath(EXPORT_AUDIO_DIR)
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 
 job_lock = threading.Lock()
+# Signalled whenever current_job changes; /api/events streams wait on it.
+job_cond = threading.Condition(job_lock)
+EVENTS_KEEPALIVE_S = 21
+DOWNLOAD_BLOCK_BYTES = 1024 * 1024
+PUBLISH_BATCH_S = 0.1
+COMPRESS_MIN_BYTES = 1024
+# Only the newest log lines are kept; status_seq counts every line ever added.
+STATUS_MAX_LINES = 500
 current_job = {
+    "version": 0,
     "running": False,
-    "status": [],
+    "status": deque(maxlen=STATUS_MAX_LINES),
+    "status_seq": 0,
     "result": None,
     "started_at": None,
     "chunks": {"total": 0, "downloaded": 0, "skipped": 0, "failed": 0, "current": ""},
 }
 
-HTML_TEMPLATE = r"""<!DOCTYPE html>
-<html lang="pl">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>UniFi Protect Transcriber</title>
-<style>
-  :root {
-    --bg: #1c1c1e; --surface: #2c2c2e; --border: #3a3a3c;
-    --text: #f5f5f7; --muted: #8e8e93; --accent: #0a84ff;
-    --accent-hover: #409cff; --danger: #ff453a; --success: #30d158;
-    --warn: #ff9f0a;
-  }
-  * { box-sizing: border-box; margin: 0; padding: 0; }
-  body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-         background: var(--bg); color: var(--text); line-height: 1.5; padding: 20px; }
-  h1 { font-size: 1.5rem; margin-bottom: 24px; }
-  .tabs { display: flex; gap: 0; border-bottom: 1px solid var(--border); margin-bottom: 24px; }
-  .tab { padding: 10px 20px; cursor: pointer; border-bottom: 2px solid transparent;
-         color: var(--muted); font-weight: 500; transition: all .2s; position: relative; }
-  .tab:hover { color: var(--text); }
-  .tab.active { color: var(--accent); border-bottom-color: var(--accent); }
-  .panel { display: none; }
-  .panel.active { display: block; }
-  .card { background: var(--surface); border: 1px solid var(--border); border-radius: 12px;
-          padding: 20px; margin-bottom: 16px; }
-  .btn { display: inline-block; padding: 10px 20px; border: none; border-radius: 8px;
-         font-size: .9rem; font-weight: 600; cursor: pointer; transition: all .2s; }
-  .btn-primary { background: var(--accent); color: white; }
-  .btn-primary:hover { background: var(--accent-hover); }
-  .btn-danger { background: var(--danger); color: white; }
-  .btn-sm { padding: 6px 14px; font-size: .8rem; }
-  .btn:disabled { opacity: .4; cursor: not-allowed; }
-  input, select { background: var(--bg); border: 1px solid var(--border); color: var(--text);
-                  padding: 8px 12px; border-radius: 8px; font-size: .9rem; width: 100%; }
-  label { display: block; font-size: .85rem; color: var(--muted); margin-bottom: 4px; margin-top: 12px; }
-  .file-list { list-style: none; }
-  .file-list li { display: flex; align-items: center; justify-content: space-between;
-                  padding: 10px 0; border-bottom: 1px solid var(--border); }
-  .file-list li:last-child { border-bottom: none; }
-  .file-name { font-weight: 500; }
-  .file-meta { color: var(--muted); font-size: .8rem; }
-  .status-log { background: var(--bg); border: 1px solid var(--border); border-radius: 8px;
-                padding: 12px; max-height: 400px; overflow-y: auto; font-family: 'SF Mono', Monaco, Consolas, monospace;
-                font-size: .8rem; white-space: pre-wrap; color: var(--muted); }
-  .badge { display: inline-block; padding: 2px 8px; border-radius: 4px; font-size: .75rem; font-weight: 600; }
-  .badge-running { background: var(--accent); color: white; animation: pulse 1.5s ease-in-out infinite; }
-  .badge-done { background: var(--success); color: black; }
-  .badge-error { background: var(--danger); color: white; }
-  .transcript-box { background: var(--bg); border: 1px solid var(--border); border-radius: 8px;
-                    padding: 16px; margin-top: 8px; font-size: .9rem; line-height: 1.6;
-                    max-height: 400px; overflow-y: auto; white-space: pre-wrap; }
-  .empty { text-align: center; color: var(--muted); padding: 40px; }
-  .row { display: flex; gap: 12px; }
-  .row > * { flex: 1; }
-
-  /* Global activity banner */
-  .activity-banner {
-    display: none; background: var(--accent); color: white; padding: 10px 20px;
-    border-radius: 10px; margin-bottom: 16px; font-weight: 500; font-size: .9rem;
-    cursor: pointer; transition: background .2s;
-    align-items: center; gap: 10px;
-  }
-  .activity-banner:hover { background: var(--accent-hover); }
-  .activity-banner.visible { display: flex; }
-  .activity-banner .spinner {
-    width: 18px; height: 18px; border: 2.5px solid rgba(255,255,255,.3);
-    border-top-color: white; border-radius: 50%; animation: spin .8s linear infinite; flex-shrink: 0;
-  }
-  .activity-banner .last-step { opacity: .85; font-size: .8rem; font-weight: 400;
-    overflow: hidden; text-overflow: ellipsis; white-space: nowrap; max-width: 500px; }
-
-  /* Tab dot indicator */
-  .tab .dot {
-    display: none; width: 8px; height: 8px; background: var(--accent); border-radius: 50%;
-    position: absolute; top: 6px; right: 6px; animation: pulse 1.5s ease-in-out infinite;
-  }
-  .tab .dot.visible { display: block; }
-
-  /* Progress bar */
-  .progress-wrap { background: var(--bg); border-radius: 6px; height: 6px; margin-top: 10px;
-    overflow: hidden; display: none; }
-  .progress-wrap.visible { display: block; }
-  .progress-bar { height: 100%; background: var(--accent); border-radius: 6px;
-    transition: width .4s ease; width: 0%; }
-
-  /* Chunk stats */
-  .chunk-stats {
-    display: flex; gap: 12px; flex-wrap: wrap; align-items: center;
-    padding: 12px 0; margin-bottom: 8px; border-bottom: 1px solid var(--border);
-  }
-  .chunk-stat { text-align: center; min-width: 70px; }
-  .chunk-stat-val { font-size: 1.4rem; font-weight: 700; color: var(--text); }
-  .chunk-stat-lbl { font-size: .7rem; color: var(--muted); text-transform: uppercase; letter-spacing: .5px; }
-  .stat-done { color: var(--success); }
-  .stat-skip { color: var(--warn); }
-  .stat-fail { color: var(--danger); }
-  .chunk-current-wrap {
-    display: flex; align-items: center; gap: 8px; margin-left: auto;
-    background: var(--bg); padding: 6px 14px; border-radius: 8px; min-width: auto; text-align: left;
-  }
-  .chunk-spinner {
-    width: 14px; height: 14px; border: 2px solid var(--border);
-    border-top-color: var(--accent); border-radius: 50%; animation: spin .7s linear infinite; flex-shrink: 0;
-  }
-  .chunk-current-text { font-size: .8rem; color: var(--text); white-space: nowrap; }
-
-  @keyframes spin { to { transform: rotate(360deg); } }
-  @keyframes pulse { 0%,100% { opacity: 1; } 50% { opacity: .5; } }
-</style>
-</head>
-<body>
-<h1>UniFi Protect Transcriber</h1>
-
-<div class="activity-banner" id="activity-banner" onclick="switchTab('process')">
-  <div class="spinner"></div>
-  <div>
-    <div>Przetwarzanie w toku...</div>
-    <div class="last-step" id="banner-step"></div>
-  </div>
-</div>
-
-<div class="tabs">
-  <div class="tab active" data-tab="files">Pliki</div>
-  <div class="tab" data-tab="process">Przetwarzanie <span class="dot" id="process-dot"></span></div>
-  <div class="tab" data-tab="transcripts">Transkrypcje</div>
-</div>
-
-<div id="files" class="panel active">
-  <div class="card">
-    <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:12px">
-      <strong>Pliki audio</strong>
-      <button class="btn btn-sm btn-primary" onclick="loadFiles()">Odswiez</button>
-    </div>
-    <ul class="file-list" id="file-list"><li class="empty">Ladowanie...</li></ul>
-  </div>
-</div>
-
-<div id="process" class="panel">
-  <div class="card" id="form-card">
-    <strong>Uruchom przetwarzanie</strong>
-    <div class="row">
-      <div>
-        <label>Tryb</label>
-        <select id="mode">
-          <option value="download">Pobierz z UniFi Protect</option>
-          <option value="local">Przetworz lokalne MP4</option>
-        </select>
-      </div>
-      <div>
-        <label>Godziny wstecz</label>
-        <input type="number" id="hours" value="{{ hours_back }}" min="1" max="168">
-      </div>
-    </div>
-    <div id="local-dir-row" style="display:none">
-      <label>Katalog z MP4</label>
-      <input type="text" id="local-dir" value="{{ export_dir }}" placeholder="/share/...">
-    </div>
-    <label>
-      <input type="checkbox" id="do-transcribe" {{ 'checked' if whisper_enabled else '' }}>
-      Uruchom transkrypcje (Whisper)
-    </label>
-    <div style="margin-top:16px">
-      <button class="btn btn-primary" id="btn-start" onclick="startJob()">Rozpocznij</button>
-    </div>
-  </div>
-
-  <div class="card" id="job-card" style="display:none">
-    <div style="display:flex;align-items:center;gap:8px;margin-bottom:8px">
-      <strong>Status</strong>
-      <span class="badge" id="job-badge">...</span>
-      <span id="job-elapsed" style="color:var(--muted);font-size:.8rem;margin-left:auto"></span>
-    </div>
-
-    <div class="chunk-stats" id="chunk-stats" style="display:none">
-      <div class="chunk-stat">
-        <div class="chunk-stat-val" id="cs-total">0</div>
-        <div class="chunk-stat-lbl">Wszystkich</div>
-      </div>
-      <div class="chunk-stat">
-        <div class="chunk-stat-val stat-done" id="cs-done">0</div>
-        <div class="chunk-stat-lbl">Pobranych</div>
-      </div>
-      <div class="chunk-stat">
-        <div class="chunk-stat-val stat-skip" id="cs-skip">0</div>
-        <div class="chunk-stat-lbl">Z cache</div>
-      </div>
-      <div class="chunk-stat">
-        <div class="chunk-stat-val stat-fail" id="cs-fail">0</div>
-        <div class="chunk-stat-lbl">Bledy</div>
-      </div>
-      <div class="chunk-stat chunk-current-wrap" id="cs-current-wrap" style="display:none">
-        <div class="chunk-spinner"></div>
-        <div class="chunk-current-text" id="cs-current"></div>
-      </div>
-    </div>
-
-    <div class="progress-wrap" id="progress-wrap"><div class="progress-bar" id="progress-bar"></div></div>
-    <div class="status-log" id="job-log"></div>
-  </div>
-</div>
-
-<div id="transcripts" class="panel">
-  <div class="card">
-    <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:12px">
-      <strong>Transkrypcje</strong>
-      <button class="btn btn-sm btn-primary" onclick="loadTranscripts()">Odswiez</button>
-    </div>
-    <div id="transcript-list"><div class="empty">Ladowanie...</div></div>
-  </div>
-</div>
-
-<script>
-const BASE = window.location.pathname.replace(/\/+$/, '');
-
-function switchTab(name) {
-  document.querySelectorAll('.tab').forEach(x => x.classList.remove('active'));
-  document.querySelectorAll('.panel').forEach(x => x.classList.remove('active'));
-  const tab = document.querySelector(`.tab[data-tab="${name}"]`);
-  if (tab) tab.classList.add('active');
-  document.getElementById(name).classList.add('active');
-}
 
-document.querySelectorAll('.tab').forEach(t => {
-  t.addEventListener('click', () => switchTab(t.dataset.tab));
-});
-
-document.getElementById('mode').addEventListener('change', e => {
-  document.getElementById('local-dir-row').style.display = e.target.value === 'local' ? 'block' : 'none';
-});
-
-async function loadFiles() {
-  try {
-    const r = await fetch(BASE + '/api/files');
-    const data = await r.json();
-    const ul = document.getElementById('file-list');
-    if (!data.files.length) { ul.innerHTML = '<li class="empty">Brak plikow audio</li>'; return; }
-    ul.innerHTML = data.files.map(f => `<li>
-      <div>
-        <div class="file-name">${f.name}</div>
-        <div class="file-meta">${f.size_mb} MB &middot; ${f.modified}</div>
-      </div>
-      <div style="display:flex;gap:6px">
-        <a class="btn btn-sm btn-primary" href="${BASE}/api/download/${encodeURIComponent(f.name)}">Pobierz</a>
-        <button class="btn btn-sm btn-danger" onclick="deleteFile('${f.name}')">Usun</button>
-      </div>
-    </li>`).join('');
-  } catch(e) { console.error('loadFiles', e); }
-}
+# Jobs run one at a time on this long-lived worker. current_job["running"]
+# stays the flag clients see; _job_done() clears it if a job dies early.
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
 
-async function deleteFile(name) {
-  if (!confirm('Usunac ' + name + '?')) return;
-  await fetch(BASE + '/api/files/' + encodeURIComponent(name), {method:'DELETE'});
-  loadFiles();
-}
 
-async function loadTranscripts() {
-  try {
-    const r = await fetch(BASE + '/api/transcripts');
-    const data = await r.json();
-    const div = document.getElementById('transcript-list');
-    if (!data.transcripts.length) { div.innerHTML = '<div class="empty">Brak transkrypcji</div>'; return; }
-    div.innerHTML = data.transcripts.map(t => `<div class="card" style="margin-bottom:12px">
-      <div style="display:flex;justify-content:space-between">
-        <strong>${t.name}</strong>
-        <span class="file-meta">${t.modified}</span>
-      </div>
-      <div class="transcript-box">${t.text}</div>
-    </div>`).join('');
-  } catch(e) { console.error('loadTranscripts', e); }
-}
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
 
-let pollTimer = null;
-
-function setRunningUI(running, lastStep) {
-  const banner = document.getElementById('activity-banner');
-  const dot = document.getElementById('process-dot');
-  const btnStart = document.getElementById('btn-start');
-
-  if (running) {
-    banner.classList.add('visible');
-    dot.classList.add('visible');
-    btnStart.disabled = true;
-    document.getElementById('job-card').style.display = 'block';
-    document.getElementById('job-badge').textContent = 'W trakcie...';
-    document.getElementById('job-badge').className = 'badge badge-running';
-    if (lastStep) document.getElementById('banner-step').textContent = lastStep;
-  } else {
-    banner.classList.remove('visible');
-    dot.classList.remove('visible');
-    btnStart.disabled = false;
-  }
-}
 
-function parseProgress(statusLines) {
-  for (let i = statusLines.length - 1; i >= 0; i--) {
-    const m = statusLines[i].match(/chunk (\d+)\/(\d+)/i);
-    if (m) return { current: parseInt(m[1]), total: parseInt(m[2]) };
-    const mLocal = statusLines[i].match(/\((\d+)\/(\d+)\)/);
-    if (mLocal) return { current: parseInt(mLocal[1]), total: parseInt(mLocal[2]) };
-  }
-  return null;
-}
+def _json(obj, status=200):
+    return Response(_dumps(obj), status=status, mimetype="application/json")
 
-function formatElapsed(isoStart) {
-  if (!isoStart) return '';
-  const start = new Date(isoStart);
-  const diff = Math.floor((Date.now() - start.getTime()) / 1000);
-  if (diff < 0) return '';
-  const m = Math.floor(diff / 60);
-  const s = diff % 60;
-  return m > 0 ? `${m}m ${s}s` : `${s}s`;
-}
 
-async function startJob() {
-  const mode = document.getElementById('mode').value;
-  const hours = document.getElementById('hours').value;
-  const localDir = document.getElementById('local-dir').value;
-  const doTranscribe = document.getElementById('do-transcribe').checked;
+@app.after_request
+def _compress_json(resp):
+    """Compresses JSON bodies of at least COMPRESS_MIN_BYTES (a full status log, long listings)."""
+    if resp.mimetype != "application/json" or resp.direct_passthrough or "Content-Encoding" in resp.headers:
+        return resp
+    resp.vary.add("Accept-Encoding")
+    body = resp.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return resp
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] > 0:
+        resp.set_data(brotli.compress(body, quality=5))
+        resp.headers["Content-Encoding"] = "br"
+    elif accepted["gzip"] > 0:
+        resp.set_data(gzip.compress(body, 6))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
 
-  setRunningUI(true, 'Uruchamianie...');
-  document.getElementById('job-log').textContent = '';
-  document.getElementById('progress-wrap').classList.remove('visible');
-  document.getElementById('progress-bar').style.width = '0%';
 
-  await fetch(BASE + '/api/start', {
-    method: 'POST',
-    headers: {'Content-Type': 'application/json'},
-    body: JSON.stringify({mode, hours: parseInt(hours), local_dir: localDir, do_transcribe: doTranscribe})
-  });
+def _encoded_bodies(body):
+    """body compressed once per supported encoding, best encoding first."""
+    bodies = {"gzip": gzip.compress(body, 9)}
+    if brotli is not None:
+        bodies = {"br": brotli.compress(body, quality=11), **bodies}
+    return bodies
 
-  startPolling();
-}
 
-function startPolling() {
-  if (pollTimer) clearInterval(pollTimer);
-  pollTimer = setInterval(pollStatus, 2000);
-  pollStatus();
-}
+def _precompressed_response(body, bodies, tag, mimetype, cache_control):
+    """Picks the best accepted encoding from bodies, with a per-encoding ETag."""
+    encoding = next((e for e in bodies if request.accept_encodings[e] > 0), None)
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(bodies.get(encoding, body), mimetype=mimetype, headers=headers)
 
-async function pollStatus() {
-  try {
-    const r = await fetch(BASE + '/api/status');
-    const data = await r.json();
-    const logEl = document.getElementById('job-log');
-    const progressWrap = document.getElementById('progress-wrap');
-    const progressBar = document.getElementById('progress-bar');
-    const elapsed = document.getElementById('job-elapsed');
-
-    logEl.textContent = data.status.join('\n');
-    logEl.scrollTop = logEl.scrollHeight;
-
-    const lastLine = data.status.length ? data.status[data.status.length - 1] : '';
-    document.getElementById('banner-step').textContent =
-      lastLine.replace(/^\[\d{2}:\d{2}:\d{2}\]\s*/, '');
-
-    const ch = data.chunks || {};
-    const statsEl = document.getElementById('chunk-stats');
-    if (ch.total > 0) {
-      statsEl.style.display = 'flex';
-      document.getElementById('cs-total').textContent = ch.total;
-      document.getElementById('cs-done').textContent = ch.downloaded;
-      document.getElementById('cs-skip').textContent = ch.skipped;
-      document.getElementById('cs-fail').textContent = ch.failed;
-
-      const cwrap = document.getElementById('cs-current-wrap');
-      if (ch.current) {
-        cwrap.style.display = 'flex';
-        document.getElementById('cs-current').textContent = ch.current;
-      } else {
-        cwrap.style.display = 'none';
-      }
-
-      const processed = ch.downloaded + ch.skipped + ch.failed;
-      progressWrap.classList.add('visible');
-      progressBar.style.width = Math.round((processed / ch.total) * 100) + '%';
-    } else {
-      const prog = parseProgress(data.status);
-      if (prog && prog.total > 0) {
-        progressWrap.classList.add('visible');
-        progressBar.style.width = Math.round((prog.current / prog.total) * 100) + '%';
-      }
-    }
-
-    if (data.running) {
-      setRunningUI(true, lastLine);
-      elapsed.textContent = formatElapsed(data.started_at);
-    } else {
-      clearInterval(pollTimer);
-      pollTimer = null;
-      setRunningUI(false);
-      progressWrap.classList.remove('visible');
-      elapsed.textContent = '';
-      statsEl.style.display = 'none';
-
-      const badge = document.getElementById('job-badge');
-      if (data.result && data.result.ok) {
-        badge.textContent = 'Zakonczone';
-        badge.className = 'badge badge-done';
-        if (data.result.transcription) {
-          logEl.textContent += '\n\n--- TRANSKRYPCJA ---\n' + data.result.transcription;
-        }
-      } else if (data.result) {
-        badge.textContent = 'Blad';
-        badge.className = 'badge badge-error';
-      } else {
-        document.getElementById('job-card').style.display = 'none';
-      }
-      logEl.scrollTop = logEl.scrollHeight;
-      loadFiles();
-      loadTranscripts();
-    }
-  } catch(e) { console.error('pollStatus', e); }
-}
 
-async function initPage() {
-  loadFiles();
-  loadTranscripts();
-  try {
-    const r = await fetch(BASE + '/api/status');
-    const data = await r.json();
-    if (data.running) {
-      switchTab('process');
-      setRunningUI(true, '');
-      startPolling();
-    } else if (data.result) {
-      document.getElementById('job-card').style.display = 'block';
-      pollStatus();
-    }
-  } catch(e) { console.error('initPage', e); }
-}
+# CSS and JS are read and compressed once at import. They are referenced with a
+# content hash (see _asset_url), so browsers may keep them for a year.
+_ASSETS = {}
+for _name, _mimetype in (("app.css", "text/css"), ("app.js", "text/javascript")):
+    _body = (STATIC_DIR / _name).read_bytes()
+    _ASSETS[_name] = (_body, _encoded_bodies(_body), hashlib.blake2b(_body, digest_size=6).hexdigest(), _mimetype)
+
+
+def _asset_url(name):
+    """static/<name> with a content hash, so a changed asset gets a new URL."""
+    return f"static/{name}?v={_ASSETS[name][2]}"
 
-initPage();
-</script>
-</body>
-</html>"""
+
+# The page is fully static (settings come from /api/config), so it is read
+# and compressed once at import as well.
+_INDEX_HTML = (STATIC_DIR / "index.html").read_bytes()
+for _name in _ASSETS:
+    _INDEX_HTML = _INDEX_HTML.replace(f'"static/{_name}"'.encode(), f'"{_asset_url(_name)}"'.encode())
+_INDEX_ETAG = hashlib.blake2b(_INDEX_HTML, digest_size=8).hexdigest()
+_INDEX_BODIES = _encoded_bodies(_INDEX_HTML)
 
 
 @app.route("/")
 def index():
-    return render_template_string(
-        HTML_TEMPLATE,
-        hours_back=HOURS_BACK,
-        export_dir=str(EXPORT_AUDIO_DIR),
-        whisper_enabled=WHISPER_ENABLED,
-    )
+    return _precompressed_response(_INDEX_HTML, _INDEX_BODIES, _INDEX_ETAG, "text/html", "public, max-age=60")
+
+
+@app.route("/static/<name>")
+def static_asset(name):
+    if name not in _ASSETS:
+        return Response(status=404)
+    body, bodies, digest, mimetype = _ASSETS[name]
+    return _precompressed_response(body, bodies, digest, mimetype, "public, max-age=31536000, immutable")
+
+
+@app.route("/api/config")
+def api_config():
+    return _json({
+        "hours_back": HOURS_BACK,
+        "export_dir": str(EXPORT_AUDIO_DIR),
+        "whisper_enabled": WHISPER_ENABLED,
+    })
+
+
+# Listings are rebuilt when the export directory's own mtime changes (a file
+# was created, renamed or removed), or at the latest after LISTING_MAX_AGE_S.
+# Files copied or written in place do not touch the directory mtime, so the age
+# limit keeps their sizes from going stale indefinitely.
+_listing_lock = threading.Lock()
+_files_cache = {"key": None, "payload": None, "etag": None, "expires": 0.0}
+_tx_cache = {"key": None, "payload": None, "etag": None, "expires": 0.0}
+LISTING_MAX_AGE_S = 10
+# A directory modified this recently may still have files being written into
+# it, so its listing is not cached yet.
+LISTING_SETTLE_NS = 2_000_000_000
+
+
+def _cached_listing(cache, build):
+    """(JSON payload, ETag) for the listing, rebuilt only when stale."""
+    try:
+        key = os.stat(_EXPORT_DIR).st_mtime_ns
+    except FileNotFoundError:
+        # Removed behind our back; recreate it rather than fail every listing.
+        os.makedirs(_EXPORT_DIR, exist_ok=True)
+        key = os.stat(_EXPORT_DIR).st_mtime_ns
+    now = time.monotonic()
+    with _listing_lock:
+        if cache["key"] == key and now < cache["expires"]:
+            return cache["payload"], cache["etag"]
+    payload = _dumps(build())
+    # Hashing the payload rather than using the dir mtime keeps the ETag
+    # correct for files that grew in place.
+    etag = hashlib.blake2b(payload, digest_size=8).hexdigest()
+    if time.time_ns() - key > LISTING_SETTLE_NS:
+        with _listing_lock:
+            cache.update(key=key, payload=payload, etag=etag, expires=now + LISTING_MAX_AGE_S)
+    return payload, etag
+
+
+def _listing_response(key, cache, build):
+    """{key: listing}, or 304 if the client's copy is still current."""
+    payload, etag = _cached_listing(cache, build)
+    headers = {"Cache-Control": "no-cache"}
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+    else:
+        resp = Response(b'{"%b":%b}' % (key, payload), mimetype="application/json", headers=headers)
+    resp.set_etag(etag, weak=True)
+    return resp
+
+
+def _invalidate_listings():
+    with _listing_lock:
+        _files_cache["key"] = None
+        _tx_cache["key"] = None
+
+
+def _scan_export_dir(suffixes):
+    """Export dir files ending in suffixes, newest first.
+
+    DirEntry caches its stat() result, so each entry costs one syscall.
+    Symlinks that lead out of the dir are left out: _export_path refuses
+    them, so they could be neither downloaded nor deleted from the UI.
+    """
+    with os.scandir(_EXPORT_DIR) as it:
+        entries = [
+            e for e in it
+            if e.name.endswith(suffixes) and e.is_file()
+            and (not e.is_symlink() or _export_path(e.name) is not None)
+        ]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return entries
+
+
+def _fmt_mb(n):
+    """Size in MiB with one decimal, rounded, using integer arithmetic."""
+    q = (n * 10 + (1 << 19)) >> 20
+    return f"{q // 10}.{q % 10}"
+
+
+def _fmt_mtime(ts):
+    """YYYY-MM-DD HH:MM (UTC), without strftime's format parsing per file."""
+    g = time.gmtime(ts)
+    return f"{g.tm_year:04d}-{g.tm_mon:02d}-{g.tm_mday:02d} {g.tm_hour:02d}:{g.tm_min:02d}"
+
+
+def _list_files():
+    files = []
+    for e in _scan_export_dir((".wav", ".mp4")):
+        st = e.stat()
+        files.append({
+            "name": e.name,
+            "size_mb": _fmt_mb(st.st_size),
+            "modified": _fmt_mtime(st.st_mtime),
+        })
+    return files
 
 
 @app.route("/api/files")
 def api_files():
-    EXPORT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-    files = []
-    for p in sorted(EXPORT_AUDIO_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-        if p.suffix in (".wav", ".mp4"):
-            st = p.stat()
-            files.append({
-                "name": p.name,
-                "size_mb": f"{st.st_size / 1024 / 1024:.1f}",
-                "modified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M"),
-            })
-    return jsonify({"files": files})
+    return _listing_response(b"files", _files_cache, _list_files)
+
+
+def _export_path(filename):
+    """Path of filename in the export dir, or None if it resolves to anything but an entry inside it."""
+    path = os.path.join(_EXPORT_DIR, filename)
+    if not os.path.realpath(path).startswith(_EXPORT_DIR + os.sep):
+        return None
+    return path
+
+
+def _send_export_file(filename, **kwargs):
+    """send_file for a regular file in the export dir, or a JSON 400/404."""
+    path = _export_path(filename)
+    if path is None:
+        return _json({"error": "Invalid file name"}, 400)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return _json({"error": "File not found"}, 404)
+    # Range/If-None-Match handling lets an interrupted download resume; the
+    # ETag comes from the stat we already have instead of the file contents.
+    return send_file(
+        path,
+        conditional=True,
+        etag=f"{st.st_mtime_ns:x}-{st.st_size:x}",
+        max_age=0,
+        **kwargs,
+    )
 
 
 @app.route("/api/download/<filename>")
 def api_download(filename):
-    path = EXPORT_AUDIO_DIR / filename
-    if not path.exists() or not path.is_file():
-        return jsonify({"error": "File not found"}), 404
-    return send_file(path, as_attachment=True)
+    return _send_export_file(filename, as_attachment=True)
 
 
 @app.route("/api/files/<filename>", methods=["DELETE"])
 def api_delete_file(filename):
-    path = EXPORT_AUDIO_DIR / filename
-    txt = path.with_suffix(".txt")
-    for f in (path, txt):
-        if f.exists():
-            f.unlink()
-    return jsonify({"ok": True})
+    path = _export_path(filename)
+    if path is None:
+        return _json({"error": "Invalid file name"}, 400)
+    try:
+        for f in (path, os.path.splitext(path)[0] + ".txt"):
+            try:
+                os.unlink(f)
+            except FileNotFoundError:
+                pass
+    except OSError as exc:
+        return _json({"error": f"Could not delete {filename}: {exc.strerror}"}, 500)
+    finally:
+        _invalidate_listings()
+    return _json({"ok": True})
+
+
+def _list_transcripts():
+    transcripts = []
+    for e in _scan_export_dir(".txt"):
+        st = e.stat()
+        if st.st_size:
+            transcripts.append({
+                "name": e.name,
+                "size": st.st_size,
+                "modified": _fmt_mtime(st.st_mtime),
+            })
+    return transcripts
 
 
 @app.route("/api/transcripts")
 def api_transcripts():
-    EXPORT_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-    transcripts = []
-    for p in sorted(EXPORT_AUDIO_DIR.glob("*.txt"), key=lambda x: x.stat().st_mtime, reverse=True):
-        st = p.stat()
-        text = p.read_text(encoding="utf-8", errors="replace").strip()
-        if text:
-            transcripts.append({
-                "name": p.name,
-                "text": text,
-                "modified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M"),
-            })
-    return jsonify({"transcripts": transcripts})
+    return _listing_response(b"transcripts", _tx_cache, _list_transcripts)
+
+
+@app.route("/api/transcripts/<filename>")
+def api_transcript(filename):
+    """One transcript's text; the listing above leaves it out."""
+    if not filename.endswith(".txt"):
+        return _json({"error": "File not found"}, 404)
+    return _send_export_file(filename, mimetype="text/plain")
+
+
+@dataclass(frozen=True)
+class JobSnapshot:
+    """Read-only copy of current_job as of one version."""
+
+    version: int
+    running: bool
+    status: tuple
+    status_seq: int
+    result: dict | None
+    started_at: str | None
+    chunks: dict
+
+    @property
+    def cursor(self) -> str:
+        """Where the log ends, as "<started_at>/<status_seq>"."""
+        return f"{self.started_at or ''}/{self.status_seq}"
+
+    def status_since(self, cursor):
+        """Log lines added after an earlier cursor, as (from_seq, lines).
+
+        from_seq is 0 when the whole retained log is returned instead: no or
+        unknown cursor, a new job, or lines already dropped from the deque.
+        """
+        job, _, seq = cursor.rpartition("/")
+        seq = int(seq) if seq.isdigit() else 0
+        missed = self.status_seq - seq
+        if not seq or job != (self.started_at or "") or not 0 <= missed <= len(self.status):
+            return 0, self.status
+        return seq, self.status[len(self.status) - missed:]
+
+    def to_dict(self, since=""):
+        start, lines = self.status_since(since)
+        return {
+            "running": self.running,
+            "status": lines,
+            "status_from": start,
+            "cursor": self.cursor,
+            "result": self.result,
+            "started_at": self.started_at,
+            "chunks": self.chunks,
+        }
 
 
-@app.route("/api/start", methods=["POST"])
-def api_start():
+def _snapshot():
+    return JobSnapshot(
+        version=current_job["version"],
+        running=current_job["running"],
+        status=tuple(current_job["status"]),
+        status_seq=current_job["status_seq"],
+        result=current_job["result"],
+        started_at=current_job["started_at"],
+        chunks=dict(current_job["chunks"]),
+    )
+
+
+# Replaced wholesale by _publish(); a plain read of this name is atomic, so
+# status readers never take job_lock.
+job_snapshot = _snapshot()
+
+
+def _publish():
+    """Bumps the job version, swaps in a new snapshot and wakes event streams.
+
+    Caller holds job_lock.
+    """
+    global job_snapshot
+    current_job["version"] += 1
+    job_snapshot = _snapshot()
+    job_cond.notify_all()
+
+
+def _job_done(future):
+    """Releases the job slot if _run raised before clearing running itself."""
+    exc = future.exception()
+    if exc is None:
+        return
+    app.logger.error("Job failed", exc_info=exc)
     with job_lock:
-        if current_job["running"]:
-            return jsonify({"error": "Job already running"}), 409
+        current_job["running"] = False
+        current_job["result"] = {"ok": False, "message": f"Error: {exc}", "audio_file": None, "transcription": None}
+        _publish()
+
 
+@app.route("/api/start", methods=["POST"])
+def api_start():
     data = request.get_json(force=True)
     mode = data.get("mode", "download")
     hours = data.get("hours", HOURS_BACK)
     local_dir = data.get("local_dir", "")
     do_transcribe = data.get("do_transcribe", WHISPER_ENABLED)
 
+    # Check and claim in one critical section, so two concurrent POSTs
+    # cannot both start a job.
+    with job_lock:
+        if current_job["running"]:
+            return _json({"error": "Job already running"}, 409)
+        current_job["running"] = True
+        current_job["status"] = deque(maxlen=STATUS_MAX_LINES)
+        current_job["status_seq"] = 0
+        current_job["result"] = None
+        current_job["started_at"] = datetime.now(timezone.utc).isoformat()
+        current_job["chunks"] = {"total": 0, "downloaded": 0, "skipped": 0, "failed": 0, "current": ""}
+        _publish()
+
     def _run():
-        with job_lock:
-            current_job["running"] = True
-            current_job["status"] = []
-            current_job["result"] = None
-            current_job["started_at"] = datetime.now(timezone.utc).isoformat()
-            current_job["chunks"] = {"total": 0, "downloaded": 0, "skipped": 0, "failed": 0, "current": ""}
+        # Status lines and counter events are collected here and folded into
+        # current_job at most PUBLISH_BATCH_S later, in one critical section
+        # and one snapshot. Label, total and done events go out at once,
+        # together with anything still pending.
+        pending = {"downloaded": 0, "skipped": 0, "failed": 0}
+        pending_lines = []
+        pending_lock = threading.Lock()
+        flush_timer = None
+        clear_current = False
+
+        def _schedule_flush():
+            # Caller holds pending_lock.
+            nonlocal flush_timer
+            if flush_timer is None:
+                flush_timer = threading.Timer(PUBLISH_BATCH_S, _flush_pending)
+                flush_timer.daemon = True
+                flush_timer.start()
+
+        def _take_pending():
+            nonlocal flush_timer, clear_current
+            with pending_lock:
+                counts = dict(pending)
+                pending.update(downloaded=0, skipped=0, failed=0)
+                lines = pending_lines[:]
+                pending_lines.clear()
+                clear = clear_current
+                clear_current = False
+                if flush_timer is not None:
+                    flush_timer.cancel()
+                    flush_timer = None
+            return counts, lines, clear
+
+        def _apply_pending(counts, lines, clear):
+            c = current_job["chunks"]
+            for key, n in counts.items():
+                c[key] += n
+            if clear:
+                c["current"] = ""
+            current_job["status"].extend(lines)
+            current_job["status_seq"] += len(lines)
+
+        def _flush_pending():
+            counts, lines, clear = _take_pending()
+            if lines or any(counts.values()):
+                with job_lock:
+                    _apply_pending(counts, lines, clear)
+                    _publish()
 
         def _cb(msg):
-            with job_lock:
-                ts = datetime.now(timezone.utc).strftime("%H:%M:%S")
-                current_job["status"].append(f"[{ts}] {msg}")
+            line = f"[{time.strftime('%H:%M:%S', time.gmtime())}] {msg}"
+            with pending_lock:
+                pending_lines.append(line)
+                _schedule_flush()
 
         def _chunks_cb(event, **kwargs):
+            nonlocal clear_current
+            if event in pending:
+                with pending_lock:
+                    pending[event] += 1
+                    clear_current = clear_current or event == "downloaded"
+                    _schedule_flush()
+                return
+            # Build strings before taking the lock; it only guards the updates.
+            if event == "downloading":
+                current = kwargs.get("label", "")
+            elif event == "extracting":
+                current = "extracting " + kwargs.get("label", "")
+            counts, lines, clear = _take_pending()
             with job_lock:
+                _apply_pending(counts, lines, clear)
                 c = current_job["chunks"]
                 if event == "total":
                     c["total"] = kwargs.get("n", 0)
-                elif event == "downloading":
-                    c["current"] = kwargs.get("label", "")
-                elif event == "downloaded":
-                    c["downloaded"] += 1
-                    c["current"] = ""
-                elif event == "skipped":
-                    c["skipped"] += 1
-                elif event == "failed":
-                    c["failed"] += 1
-                elif event == "extracting":
-                    c["current"] = "extracting " + kwargs.get("label", "")
+                elif event in ("downloading", "extracting"):
+                    c["current"] = current
                 elif event == "done":
                     c["current"] = ""
+                _publish()
 
         result = run_pipeline(
             mode=mode,
@@ -568,28 +530,120 @@ def api_start():
             status_callback=_cb,
             chunks_callback=_chunks_cb,
         )
+        _flush_pending()
 
         with job_lock:
             current_job["running"] = False
             current_job["result"] = result
+            _publish()
+
+    _job_executor.submit(_run).add_done_callback(_job_done)
+    return _json({"ok": True, "message": "Job started"})
 
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
-    return jsonify({"ok": True, "message": "Job started"})
+
+# Encoded /api/status bodies for one job version, by ?since= value. Also
+# replaced wholesale when the version moves on. Only the full body ("") and
+# the up-to-date one (since == the snapshot's cursor) are kept, since those
+# are what every poll asks for; any other client-supplied value would grow
+# the dict without bound while a finished job's version stands still.
+_status_cache = (None, {})
+# Versions restart at 0 with the process; keep their ETags from colliding.
+_STATUS_ETAG_PREFIX = os.urandom(4).hex()
 
 
 @app.route("/api/status")
 def api_status():
-    with job_lock:
-        return jsonify({
-            "running": current_job["running"],
-            "status": list(current_job["status"]),
-            "result": current_job["result"],
-            "started_at": current_job["started_at"],
-            "chunks": dict(current_job["chunks"]),
-        })
+    """Job state; with ?since=<cursor> only the log lines added after it."""
+    global _status_cache
+    since = request.args.get("since", "")
+    snap = job_snapshot
+    cache = _status_cache
+    body = cache[1].get(since) if cache[0] == snap.version else None
+
+    etag = f"{_STATUS_ETAG_PREFIX}-{snap.version}"
+    headers = {"Cache-Control": "no-cache"}
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+        resp.set_etag(etag, weak=True)
+        return resp
+    if body is None:
+        body = _dumps(snap.to_dict(since))
+        if cache[0] is None or cache[0] < snap.version:
+            cache = _status_cache = (snap.version, {})
+        if cache[0] == snap.version and since in ("", snap.cursor):
+            cache[1][since] = body
+    resp = Response(body, mimetype="application/json", headers=headers)
+    resp.set_etag(etag, weak=True)
+    return resp
+
+
+@app.route("/api/state")
+def api_state():
+    """Both listings and the job state in one round trip.
+
+    ?files= and ?transcripts= take the ETag of the listing the client already
+    has; a listing that still matches is sent as null. ?since= works as for
+    /api/status.
+    """
+    files, files_etag = _cached_listing(_files_cache, _list_files)
+    transcripts, tx_etag = _cached_listing(_tx_cache, _list_transcripts)
+    snap = job_snapshot
+
+    etag = f"{files_etag}-{tx_etag}-{_STATUS_ETAG_PREFIX}-{snap.version}"
+    headers = {"Cache-Control": "no-cache"}
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+        resp.set_etag(etag, weak=True)
+        return resp
+    if request.args.get("files") == files_etag:
+        files = b"null"
+    if request.args.get("transcripts") == tx_etag:
+        transcripts = b"null"
+    # The listings are already encoded; splice them in rather than decode them.
+    body = b'{"files":%b,"transcripts":%b,"etags":%b,"job":%b}' % (
+        files,
+        transcripts,
+        _dumps({"files": files_etag, "transcripts": tx_etag}),
+        _dumps(snap.to_dict(request.args.get("since", ""))),
+    )
+    resp = Response(body, mimetype="application/json", headers=headers)
+    resp.set_etag(etag, weak=True)
+    return resp
+
+
+@app.route("/api/events")
+def api_events():
+    """Server-Sent Events: pushes new status lines and chunk counters as they change."""
+    # Event ids are status cursors, so a reconnecting EventSource only
+    # receives the log lines it has not seen yet.
+    cursor = request.headers.get("Last-Event-ID", "")
+
+    def stream():
+        nonlocal cursor
+        version = None
+        while True:
+            with job_cond:
+                job_cond.wait_for(lambda: job_snapshot.version != version, timeout=EVENTS_KEEPALIVE_S)
+            snap = job_snapshot
+            if snap.version == version:
+                yield b": keep-alive\n\n"
+                continue
+            version = snap.version
+            data = _dumps(snap.to_dict(cursor))
+            cursor = snap.cursor
+            yield b"id: %s\ndata: %s\n\n" % (cursor.encode("utf-8"), data)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _file_wrapper(f, buffer_size=8192):
+    """wsgi.file_wrapper for send_file: moves downloads in 1 MiB blocks instead of 8 KiB."""
+    return FileWrapper(f, max(buffer_size, DOWNLOAD_BLOCK_BYTES))
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("INGRESS_PORT", 8099))
-    app.run(host="0.0.0.0", port=port)
+    from gevent.pywsgi import WSGIServer
+
+    WSGIServer(("0.0.0.0", port), app, environ={"wsgi.file_wrapper": _file_wrapper}).serve_forever()